@@ -0,0 +1,71 @@
+"""
+Time to load contacts one ``create_contact`` call at a time vs ``create_contacts`` in chunks.
+
+Row-by-row is timed on ``SINGLE`` contacts and reported per 1000; the bulk path loads ``BULK`` contacts
+into SQLite with each chunk size in ``CHUNK_SIZES``.
+
+Run from the project root::
+
+    python -m benchmarks.contacts_bulk
+"""
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.entity.models import Base, User
+from src.entity.principal import Principal
+from src.repository.contacts import create_contact, create_contacts
+from src.schemas.contacts import ContactSchema
+
+DB_URL = "sqlite+aiosqlite:///./contacts_bulk.db"
+SINGLE = 2_000
+BULK = 100_000
+CHUNK_SIZES = (100, 1000, 5000)
+
+engine = create_async_engine(DB_URL)
+session_maker = async_sessionmaker(engine, expire_on_commit=False)
+user = Principal(1, "bulk@example.com", "bulk", "avatar", True)
+
+
+async def reset():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=user.id, username=user.username, email=user.email,
+                                               password="x", avatar=user.avatar, verified=True))
+
+
+def contacts(count: int) -> list[ContactSchema]:
+    return [ContactSchema(full_name=f"Contact {i}", email=f"contact{i}@example.com", phone_number=f"{i:010}",
+                          birthday=date(1990, 1, 1)) for i in range(count)]
+
+
+async def main():
+    print(f"{'mode':<20}{'rows':>8}{'seconds':>10}{'ms/1000 rows':>14}")
+
+    await reset()
+    bodies = contacts(SINGLE)
+    start = time.perf_counter()
+    async with session_maker() as session:
+        for body in bodies:
+            await create_contact(body, session, user)
+    elapsed = time.perf_counter() - start
+    print(f"{'row by row':<20}{SINGLE:>8}{elapsed:>10.2f}{elapsed / SINGLE * 1e6:>14.1f}")
+
+    bodies = contacts(BULK)
+    for chunk_size in CHUNK_SIZES:
+        await reset()
+        start = time.perf_counter()
+        async with session_maker() as session:
+            created, conflicts = await create_contacts(bodies, session, user, chunk_size)
+        elapsed = time.perf_counter() - start
+        assert len(created) == BULK and not conflicts
+        print(f"{f'bulk, chunk {chunk_size}':<20}{BULK:>8}{elapsed:>10.2f}{elapsed / BULK * 1e6:>14.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
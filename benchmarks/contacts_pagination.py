@@ -0,0 +1,68 @@
+"""
+Per-page latency of offset vs keyset pagination of ``GET /api/contacts`` at increasing depth.
+
+Seeds ``CONTACTS`` contacts for one user (interleaved with another user's) into SQLite and times
+the repository queries behind both modes, 100-row pages.
+
+Run from the project root::
+
+    python -m benchmarks.contacts_pagination
+"""
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.entity.models import Base, Contacts, User
+from src.entity.principal import Principal
+from src.repository.contacts import get_contacts, get_contacts_after
+
+DB_URL = "sqlite+aiosqlite:///./contacts_pagination.db"
+CONTACTS = 50_000
+PAGE = 100
+DEPTHS = (0, 1_000, 10_000, 25_000, 49_000)
+REPEAT = 20
+
+engine = create_async_engine(DB_URL)
+session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for user_id in (1, 2):
+            await conn.execute(insert(User).values(id=user_id, username=f"user{user_id}", email=f"{user_id}@example.com",
+                                                   password="x", avatar="avatar", verified=True))
+        rows = [{"full_name": f"Contact {i}", "email": f"contact{i}@example.com", "phone_number": f"{i:010}",
+                 "birthday": date(1990, 1, 1), "user_id": 1 + i % 2} for i in range(CONTACTS * 2)]
+        await conn.execute(insert(Contacts), rows)
+
+
+async def timed(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        async with session_maker() as session:
+            await fn(session)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+async def main():
+    await seed()
+    user = Principal(1, "1@example.com", "user1", "avatar", True)
+    async with session_maker() as session:
+        ids = [c.id for c in await get_contacts_after(CONTACTS, None, session, user)]
+
+    print(f"{'depth':>8}{'offset, ms':>12}{'keyset, ms':>12}")
+    for depth in DEPTHS:
+        after_id = ids[depth - 1] if depth else None
+        offset_ms = await timed(lambda session: get_contacts(PAGE, depth, session, user))
+        keyset_ms = await timed(lambda session: get_contacts_after(PAGE, after_id, session, user))
+        print(f"{depth:>8}{offset_ms:>12.2f}{keyset_ms:>12.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Payload size and response time of a max-size ``GET /api/contacts`` page: full vs sparse fields.
+
+Seeds one 500-contact page into SQLite and requests it through the ASGI app, once in the default
+representation (owner joined and embedded in every item, validated against ``ContactResponse``) and
+once with ``fields=`` listing every contact field (flat, no join).
+
+Run from the project root::
+
+    python -m benchmarks.contacts_payload
+"""
+import asyncio
+import time
+from datetime import date
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from main import app
+from src.database.db import get_db
+from src.entity.models import Base, Contacts, User
+from src.entity.principal import Principal
+from src.repository.contacts import CONTACT_FIELDS
+from src.services.auth import auth_service
+
+DB_URL = "sqlite+aiosqlite:///./contacts_payload.db"
+PAGE = 500
+REPEAT = 50
+
+engine = create_async_engine(DB_URL)
+session_maker = async_sessionmaker(engine, expire_on_commit=False)
+principal = Principal(1, "deadpool@example.com", "deadpool", "https://www.gravatar.com/avatar/6e0e3c5f1d0b3c8a", True)
+
+
+async def override_get_db():
+    async with session_maker() as session:
+        yield session
+
+
+async def override_get_current_principal():
+    return principal
+
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=principal.id, username=principal.username, email=principal.email,
+                                               password="x", avatar=principal.avatar, verified=True))
+        await conn.execute(insert(Contacts), [
+            {"full_name": f"Contact {i}", "email": f"contact{i}@example.com", "phone_number": f"{i:010}",
+             "birthday": date(1990, 1, 1 + i % 28), "user_id": principal.id} for i in range(PAGE)
+        ])
+
+
+async def measure(client: httpx.AsyncClient, params: dict) -> tuple[int, float]:
+    response = await client.get("/api/contacts/", params=params)
+    assert response.status_code == 200, response.text
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        await client.get("/api/contacts/", params=params)
+    return len(response.content), (time.perf_counter() - start) / REPEAT * 1000
+
+
+async def main():
+    await seed()
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[auth_service.get_current_principal] = override_get_current_principal
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        full = await measure(client, {"limit": PAGE})
+        sparse = await measure(client, {"limit": PAGE, "fields": ",".join(CONTACT_FIELDS)})
+    await engine.dispose()
+
+    print(f"{'representation':<16}{'bytes':>10}{'ms/page':>10}")
+    print(f"{'full':<16}{full[0]:>10}{full[1]:>10.2f}")
+    print(f"{'fields=...':<16}{sparse[0]:>10}{sparse[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Latency of an unrelated endpoint during a login storm.
+
+Fires ``LOGINS`` concurrent ``/api/auth/login`` requests against an in-process app backed by SQLite
+while probing ``/api/metrics`` every few milliseconds, and prints the probe's p50/p99. It runs the storm
+twice: once with bcrypt executed inline on the event loop (the previous behaviour) and once on the
+password hashing pool.
+
+Run from the project root::
+
+    python -m benchmarks.login_storm
+"""
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from main import app
+from src.database.db import get_db
+from src.entity.models import Base, User
+from src.services.auth import auth_service
+
+DB_URL = "sqlite+aiosqlite:///./login_storm.db"
+LOGINS = 40
+PROBE_INTERVAL = 0.005
+EMAIL, PASSWORD = "storm@example.com", "12345678"
+
+engine = create_async_engine(DB_URL, connect_args={"timeout": 30})
+session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def override_get_db():
+    async with session_maker() as session:
+        yield session
+
+
+class InlineHasher:
+    """Previous behaviour: hash on the event loop."""
+
+    def __init__(self, context):
+        self.context = context
+
+    async def hash(self, password):
+        return self.context.hash(password)
+
+    async def verify(self, plain_password, hashed_password):
+        return self.context.verify(plain_password, hashed_password)
+
+    def stats(self):
+        return {}
+
+
+async def setup():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_maker() as session:
+        session.add(User(username="storm", email=EMAIL, password=auth_service.pwd_context.hash(PASSWORD),
+                         avatar="avatar", verified=True))
+        await session.commit()
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list[float]):
+    # The client shares the event loop with the app, so latency is measured from the moment the probe
+    # was due rather than from when it got to run, and every probe that a stall prevented from being sent
+    # is recorded too; otherwise a blocked loop would hide itself behind a handful of samples.
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/api/metrics")
+        latency = time.perf_counter() - due
+        while latency > 0:
+            latencies.append(latency)
+            latency -= PROBE_INTERVAL
+            due += PROBE_INTERVAL
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+
+
+async def run(client: httpx.AsyncClient, logins: int) -> list[float]:
+    latencies = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(client, stop, latencies))
+    await asyncio.sleep(0.1)
+    responses = await asyncio.gather(*(
+        client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD}) for _ in range(logins)
+    ))
+    await asyncio.sleep(0.1)
+    stop.set()
+    await prober
+    assert all(r.status_code in (200, 503) for r in responses), [r.status_code for r in responses]
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    print(f"{name:<24}{len(latencies):>8}{quantiles[49] * 1000:>10.2f}{quantiles[98] * 1000:>10.2f}"
+          f"{max(latencies) * 1000:>10.2f}")
+
+
+async def main():
+    await setup()
+    app.dependency_overrides[get_db] = override_get_db
+    transport = httpx.ASGITransport(app=app)
+    pooled = auth_service.hasher
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        print(f"{'scenario':<24}{'probes':>8}{'p50, ms':>10}{'p99, ms':>10}{'max, ms':>10}")
+        report("idle", await run(client, 0))
+        auth_service.hasher = InlineHasher(auth_service.pwd_context)
+        report("storm, inline bcrypt", await run(client, LOGINS))
+        auth_service.hasher = pooled
+        report("storm, hashing pool", await run(client, LOGINS))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
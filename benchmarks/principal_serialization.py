@@ -0,0 +1,36 @@
+"""
+Bytes per cache entry and decode time: pickled ORM ``User`` vs encoded ``Principal``.
+
+Run from the project root::
+
+    python -m benchmarks.principal_serialization
+"""
+import pickle
+import timeit
+from datetime import datetime
+
+from src.entity.models import User
+from src.entity.principal import Principal
+
+NUMBER = 100_000
+
+
+def main():
+    user = User(id=42, username="deadpool", email="deadpool@example.com", password="$2b$12$" + "x" * 53,
+                avatar="https://www.gravatar.com/avatar/6e0e3c5f1d0b3c8a9e8f0b1f2a3d4c5e", verified=True,
+                refresh_token=None, created_at=datetime.now(), updated_at=datetime.now())
+    principal = Principal.from_user(user)
+
+    pickled = pickle.dumps(user)
+    encoded = principal.dumps()
+
+    pickle_time = timeit.timeit(lambda: pickle.loads(pickled), number=NUMBER)
+    principal_time = timeit.timeit(lambda: Principal.loads(encoded), number=NUMBER)
+
+    print(f"{'format':<20}{'bytes/entry':>12}{'decode, us':>12}")
+    print(f"{'pickle(User)':<20}{len(pickled):>12}{pickle_time / NUMBER * 1e6:>12.2f}")
+    print(f"{'Principal v1':<20}{len(encoded):>12}{principal_time / NUMBER * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
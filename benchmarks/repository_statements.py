@@ -0,0 +1,121 @@
+"""
+Per-call Python overhead of the hot repository reads: statements built on every call vs built once.
+
+``before`` rebuilds each ``select(...).filter_by(...)`` construct per call, as the repository used to;
+``after`` calls the repository, which executes pre-built statements with bound parameters. Both are
+timed twice: constructing the statement and deriving its compiled-cache key only, then the whole call
+against a small SQLite database, where the query itself is cheap and the Python side dominates.
+
+Run from the project root::
+
+    python -m benchmarks.repository_statements
+"""
+import asyncio
+import time
+from datetime import date
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.entity.models import Base, Contacts, User
+from src.entity.principal import Principal
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.repository.contacts import CONTACT_VERSION_FIELDS
+
+DB_URL = "sqlite+aiosqlite:///./repository_statements.db"
+CONTACTS = 20
+REPEAT = 5_000
+
+engine = create_async_engine(DB_URL)
+session_maker = async_sessionmaker(engine, expire_on_commit=False)
+user = Principal(1, "1@example.com", "user1", "avatar", True)
+
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User).values(id=user.id, username=user.username, email=user.email,
+                                               password="x", avatar=user.avatar, verified=True))
+        await conn.execute(insert(Contacts), [
+            {"full_name": f"Contact {i}", "email": f"contact{i}@example.com", "phone_number": f"{i:010}",
+             "birthday": date(1990, 1, 1), "user_id": user.id} for i in range(CONTACTS)
+        ])
+
+
+# The statements as the repository built them on every call
+def before_user_by_email():
+    return select(User).filter_by(email=user.email)
+
+
+def before_contact():
+    return select(*(getattr(Contacts, field) for field in CONTACT_VERSION_FIELDS)).filter_by(id=1, user_id=user.id)
+
+
+def before_contacts():
+    return select(Contacts).filter_by(user_id=user.id).offset(0).limit(10)
+
+
+def after_user_by_email():
+    return repository_users.USER_BY_EMAIL
+
+
+def after_contact():
+    return repository_contacts._contact_stmt(CONTACT_VERSION_FIELDS, False)
+
+
+def after_contacts():
+    return repository_contacts._contacts_page_stmt(None)
+
+
+QUERIES = {
+    "get_user_by_email": (
+        before_user_by_email,
+        after_user_by_email,
+        lambda db: db.execute(before_user_by_email()),
+        lambda db: repository_users.get_user_by_email(user.email, db),
+    ),
+    "get_contact": (
+        before_contact,
+        after_contact,
+        lambda db: db.execute(before_contact()),
+        lambda db: repository_contacts.get_contact(1, db, user, CONTACT_VERSION_FIELDS),
+    ),
+    "get_contacts": (
+        before_contacts,
+        after_contacts,
+        lambda db: db.execute(before_contacts()),
+        lambda db: repository_contacts.get_contacts(10, 0, db, user),
+    ),
+}
+
+
+def build_us(build) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        build()._generate_cache_key()
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+async def call_us(call) -> float:
+    async with session_maker() as session:
+        await call(session)
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            await call(session)
+        return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+async def main():
+    await seed()
+    print(f"{'query':<20}{'build+key, us':>28}{'call, us':>24}")
+    print(f"{'':<20}{'before':>14}{'after':>14}{'before':>12}{'after':>12}")
+    for name, (build_before, build_after, call_before, call_after) in QUERIES.items():
+        print(f"{name:<20}{build_us(build_before):>14.1f}{build_us(build_after):>14.1f}"
+              f"{await call_us(call_before):>12.1f}{await call_us(call_after):>12.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
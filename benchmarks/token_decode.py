@@ -0,0 +1,37 @@
+"""
+Cold vs warm decode of an access token in ``Auth.decode_access_token``.
+
+Cold clears the verified-token cache before every call, so each call pays for signature verification
+and claims parsing; warm hits the cache.
+
+Run from the project root::
+
+    python -m benchmarks.token_decode
+"""
+import asyncio
+import timeit
+
+from src.services.auth import auth_service
+
+NUMBER = 50_000
+
+
+def cold(token: str):
+    auth_service.token_cache.clear()
+    auth_service.decode_access_token(token)
+
+
+def main():
+    token = asyncio.run(auth_service.create_access_token(data={"sub": "deadpool@example.com"}))
+    clear_time = timeit.timeit(auth_service.token_cache.clear, number=NUMBER)
+    cold_time = timeit.timeit(lambda: cold(token), number=NUMBER) - clear_time
+    auth_service.decode_access_token(token)
+    warm_time = timeit.timeit(lambda: auth_service.decode_access_token(token), number=NUMBER)
+
+    print(f"{'path':<8}{'us/call':>10}")
+    print(f"{'cold':<8}{cold_time / NUMBER * 1e6:>10.2f}")
+    print(f"{'warm':<8}{warm_time / NUMBER * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from ipaddress import ip_address
 from typing import Callable
@@ -12,8 +13,13 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.database.db import get_db
+from src.database.db import get_db, sessionmanager
+from src.database.instrumentation import ServerTimingMiddleware, sql_instrumentation
 from src.routes import contacts, auth, users
+from src.services.auth import auth_service
+from src.services.cache import redis_pool
+from src.services.page_cache import contacts_page_cache
+from src.services.tombstones import purge_tombstones_periodically
 
 import redis.asyncio as redis
 from fastapi_limiter import FastAPILimiter
@@ -31,7 +37,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(ServerTimingMiddleware, instrumentation=sql_instrumentation)
 
 
 # @app.middleware("http")
@@ -57,13 +65,19 @@ app.include_router(users.router, prefix="/api")
 
 @app.on_event("startup")
 async def startup():
-    r = await redis.Redis(
-        host=config.REDIS_DOMAIN,
-        port=config.REDIS_PORT,
-        db=0,
-        password=config.REDIS_PASSWORD,
-    )
+    r = await redis.Redis(connection_pool=redis_pool)
     await FastAPILimiter.init(r)
+    app.state.user_cache_listener = asyncio.create_task(auth_service.cache.listen())
+    app.state.tombstone_purger = asyncio.create_task(purge_tombstones_periodically(
+        sessionmanager.session, config.CONTACTS_TOMBSTONE_RETENTION, config.CONTACTS_TOMBSTONE_PURGE_INTERVAL))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.user_cache_listener.cancel()
+    app.state.tombstone_purger.cancel()
+    auth_service.hasher.shutdown()
+    await sessionmanager.close()
 
 
 templates = Jinja2Templates(directory=BASE_DIR / "src" / "templates")
@@ -111,5 +125,27 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
 #     TODO: something to do here
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """
+    Runtime metrics of this worker process.
+
+    Returns:
+        dict: Hit/miss counters of every cache used to resolve the current user or serve contact pages,
+        the load of the password hashing pool and the database connection pools, the SQL statements run
+        and how many requests never checked out a database connection, and how reads were routed between
+        the primary database and its replicas.
+    """
+    return {
+        "user_cache": auth_service.cache.stats(),
+        "token_cache": auth_service.token_cache.stats(),
+        "password_hasher": auth_service.hasher.stats(),
+        "contacts_page_cache": contacts_page_cache.stats(),
+        "db_pool": sessionmanager.pool_stats(),
+        "sql": sql_instrumentation.stats(),
+        "db_replicas": sessionmanager.replica_stats(),
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=int(os.environ.get("PORT", 8000)), log_level="info")
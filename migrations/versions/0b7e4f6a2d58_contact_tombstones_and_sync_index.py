@@ -0,0 +1,37 @@
+"""contact_tombstones_and_sync_index
+
+Revision ID: 0b7e4f6a2d58
+Revises: 5d9a3e8c0f21
+Create Date: 2026-10-18 17:21:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e4f6a2d58'
+down_revision: Union[str, None] = '5d9a3e8c0f21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('contact_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_contact_tombstones_user_id_id', 'contact_tombstones', ['user_id', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_updated_at', 'contacts', ['user_id', ' updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_updated_at', table_name='contacts')
+    op.drop_index('ix_contact_tombstones_user_id_id', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
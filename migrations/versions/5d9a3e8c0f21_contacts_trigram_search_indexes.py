@@ -0,0 +1,32 @@
+"""contacts_trigram_search_indexes
+
+Revision ID: 5d9a3e8c0f21
+Revises: c41f7d2a9b36
+Create Date: 2026-10-18 15:48:19.206317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9a3e8c0f21'
+down_revision: Union[str, None] = 'c41f7d2a9b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('full_name', 'email', 'phone_number')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in COLUMNS:
+        op.create_index(f'ix_contacts_{column}_trgm', 'contacts', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    for column in COLUMNS:
+        op.drop_index(f'ix_contacts_{column}_trgm', table_name='contacts')
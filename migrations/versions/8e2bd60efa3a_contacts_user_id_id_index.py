@@ -0,0 +1,26 @@
+"""contacts_user_id_id_index
+
+Revision ID: 8e2bd60efa3a
+Revises: f34ab1dd9ffd
+Create Date: 2026-10-18 13:52:10.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e2bd60efa3a'
+down_revision: Union[str, None] = 'f34ab1dd9ffd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
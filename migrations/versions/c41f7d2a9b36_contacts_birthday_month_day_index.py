@@ -0,0 +1,28 @@
+"""contacts_birthday_month_day_index
+
+Revision ID: c41f7d2a9b36
+Revises: 8e2bd60efa3a
+Create Date: 2026-10-18 15:06:42.731904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f7d2a9b36'
+down_revision: Union[str, None] = '8e2bd60efa3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    birthday = sa.column('birthday', sa.Date)
+    month_day = sa.extract('month', birthday) * sa.literal_column('100') + sa.extract('day', birthday)
+    op.create_index('ix_contacts_user_id_birthday_md', 'contacts', [sa.column('user_id'), month_day], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_md', table_name='contacts')
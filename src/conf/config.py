@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ConfigDict, field_validator, EmailStr
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
@@ -8,6 +10,19 @@ load_dotenv()
 
 class Settings(BaseSettings):
     DB_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_RETRY_AFTER: float = 30
+    # Must exceed the replicas' lag: it also bounds how stale a page cached from a replica can be
+    DB_READ_YOUR_WRITES_WINDOW: float = 5
+    RECENT_WRITES_STORE: Literal["redis", "memory"] = "redis"
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+    SQL_SLOW_QUERY_MS: float = 200
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
     SECRET_KEY_JWT: str
     ALGORITHM: str
     MAIL_USERNAME: EmailStr
@@ -18,6 +33,30 @@ class Settings(BaseSettings):
     REDIS_DOMAIN: str = 'localhost'
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: str | None = None
+    REDIS_MAX_CONNECTIONS: int = 50
+    USER_CACHE_TTL: int = 300
+    USER_CACHE_L1_SIZE: int = 1024
+    USER_CACHE_L1_TTL: float = 300
+    USER_CACHE_EARLY_REFRESH_BETA: float = 1.0
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    TOKEN_CACHE_SIZE: int = 4096
+    AUTH_EMBED_CLAIMS: bool = False
+    REFRESH_TOKEN_STORE: Literal["redis", "memory"] = "redis"
+    CONTACTS_BULK_MAX: int = 100_000
+    CONTACTS_BULK_CHUNK_SIZE: int = 1000
+    CONTACTS_EXPORT_BATCH_SIZE: int = 1000
+    CONTACTS_IMPORT_BATCH_SIZE: int = 1000
+    CONTACTS_IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    CONTACTS_IMPORT_MAX_ERRORS: int = 100
+    CONTACTS_IMPORT_JOB_TTL: int = 24 * 60 * 60
+    IMPORT_JOB_STORE: Literal["redis", "memory"] = "redis"
+    CONTACTS_PAGE_CACHE_TTL: int = 300
+    CONTACTS_PAGE_CACHE_STORE: Literal["redis", "memory"] = "redis"
+    # Should exceed the longest write transaction; changes reach sync clients this much later
+    CONTACTS_SYNC_SAFETY_MARGIN: float = 5
+    CONTACTS_TOMBSTONE_RETENTION: int = 30 * 24 * 60 * 60
+    CONTACTS_TOMBSTONE_PURGE_INTERVAL: int = 60 * 60
     CLD_NAME: str
     CLD_API_KEY: int
     CLD_API_SECRET: str
@@ -1,16 +1,121 @@
 import contextlib
+import itertools
+import logging
+import time
+from typing import Sequence
 
+from redis.exceptions import RedisError
+from sqlalchemy import exc, make_url
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only, greenlet_spawn
+from sqlalchemy.util.concurrency import in_greenlet
 
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
 from src.conf.config import config
+from src.services.recent_writes import InMemoryRecentWritesStore, RecentWritesStore, recent_writes_store
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a replica cannot be reached, rather than a problem with the statement
+CONNECTION_ERRORS = (exc.DBAPIError, exc.TimeoutError, OSError)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts take and how often they time out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        # Covers waiting for a free connection, opening an overflow one and the pre-ping
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def stats(self) -> dict:
+        wait_avg = self.wait_total / self.checkouts if self.checkouts else 0.0
+        return {"size": self.size(), "in_use": self.checkedout(), "idle": self.checkedin(),
+                "overflow": max(0, self.overflow()), "max_overflow": self._max_overflow, "checkouts": self.checkouts,
+                "timeouts": self.timeouts, "wait_avg_ms": wait_avg * 1000, "wait_max_ms": self.wait_max * 1000}
+
+
+class LazyBindSession(Session):
+    """
+    Session whose ``info`` may hold a ``connect`` callable: the connection it returns, made on the session's
+    first statement, is then the session's bind. Whoever supplied the callable closes that connection.
+
+    Outside of a statement, e.g. to look up the dialect, the session's engine is returned without connecting.
+    """
+
+    def get_bind(self, mapper=None, **kw):
+        connect = self.info.get("connect")
+        if connect is None or ("connection" not in self.info and not in_greenlet()):
+            return super().get_bind(mapper, **kw)
+        if "connection" not in self.info:
+            self.info["connection"] = connect()
+        return self.info["connection"]
 
 
 class DatabaseSessionManager:
-    def __init__(self, url: str):
-        self._engine: AsyncEngine | None = create_async_engine(url)
-        self._session_maker: async_sessionmaker = async_sessionmaker(autoflush=False, autocommit=False,
-                                                                     bind=self._engine)
+    """
+    Sessions on the primary database and, for read-only work, on its read replicas.
+
+    Sessions are lazy: no connection is checked out until their first statement, so a request served from
+    caches costs no connection at all; ``SqlInstrumentation`` counts how many requests never needed one.
+    Read sessions also choose between the primary and a replica only then.
+
+    Replicas are handed out round-robin. One that fails to connect is skipped for ``replica_retry_after``
+    seconds, and with none left reads fall back to the primary. Since replicas lag behind, reads keyed by
+    someone who wrote in the last ``read_your_writes`` seconds (see ``record_write``) go to the primary as
+    well. Writes are recorded in ``recent_writes``, shared by every worker when it is the Redis store; the
+    window has to exceed the replicas' lag.
+    """
+
+    def __init__(self, url: str, pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30,
+                 pool_recycle: int = -1, pool_pre_ping: bool = False, replica_urls: Sequence[str] = (),
+                 replica_retry_after: float = 30, read_your_writes: float = 5,
+                 recent_writes: RecentWritesStore | None = None, prepared_statement_cache_size: int = 100):
+        pool = dict(poolclass=InstrumentedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                    pool_timeout=pool_timeout, pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping)
+
+        def create_engine(engine_url: str) -> AsyncEngine:
+            connect_args = {}
+            if make_url(engine_url).get_driver_name() == "asyncpg":
+                # Statements prepared per connection; the hot ones should never be evicted
+                connect_args["prepared_statement_cache_size"] = prepared_statement_cache_size
+            return create_async_engine(engine_url, connect_args=connect_args, **pool)
+
+        self._engine: AsyncEngine | None = create_engine(url)
+        self._session_maker: async_sessionmaker = self._maker(self._engine)
+        self._replica_engines = [create_engine(replica_url) for replica_url in replica_urls]
+        self._next_replica = itertools.cycle(range(len(self._replica_engines)))
+        self._replica_down_until = [0.0] * len(self._replica_engines)
+        self.replica_retry_after = replica_retry_after
+        self.read_your_writes = read_your_writes
+        self.recent_writes = recent_writes if recent_writes is not None else InMemoryRecentWritesStore()
+        self.primary_reads = 0
+        self.replica_reads = 0
+        self.replica_failures = 0
+
+    @staticmethod
+    def _maker(engine: AsyncEngine) -> async_sessionmaker:
+        # Objects stay usable after commit: writes return rows through RETURNING and are not re-read
+        return async_sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, bind=engine,
+                                  sync_session_class=LazyBindSession)
 
     @contextlib.asynccontextmanager
     async def session(self):
@@ -20,16 +125,154 @@ class DatabaseSessionManager:
         try:
             yield session
         except Exception as err:
-            print(err)
+            logger.debug("Rolling back session: %r", err)
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def record_write(self, key: str):
+        """
+        Pin reads keyed by ``key``, usually the user's email, to the primary for the read-your-writes window.
+
+        Called after the commit, before any cache of the written data is invalidated, so a reader that sees
+        the invalidation also sees the write as recent. Store errors are logged, not raised: the write is
+        committed already. Without replicas every read is on the primary and nothing is recorded.
+        """
+        if self.read_your_writes <= 0 or not self._replica_engines:
+            return
+        try:
+            await self.recent_writes.mark(key, self.read_your_writes)
+        except (RedisError, OSError) as err:
+            logger.warning("Could not record the write of %s: %s", key, err)
+
+    async def wrote_recently(self, key: str) -> bool:
+        """Whether ``key`` wrote within the read-your-writes window; when the store is unreachable, assume so."""
+        if self.read_your_writes <= 0:
+            return False
+        try:
+            return await self.recent_writes.is_recent(key)
+        except (RedisError, OSError) as err:
+            logger.warning("Could not look up recent writes of %s: %s", key, err)
+            return True
+
+    def _pick_replica(self) -> int | None:
+        # Every replica at most once, starting with the next one in turn
+        for _ in range(len(self._replica_engines)):
+            index = next(self._next_replica)
+            if self._replica_down_until[index] <= time.monotonic():
+                return index
+        return None
+
+    def _connect_read(self, session: AsyncSession, key: str | None) -> Connection:
+        # Runs in the greenlet of the session's first statement, so the store is awaited from sync code.
+        # Should the replica not accept connections, the statement runs on the next healthy replica or,
+        # with none left, on the primary
+        index = None
+        if key is None or not await_only(self.wrote_recently(key)):
+            index = self._pick_replica()
+        while index is not None:
+            try:
+                connection = self._replica_engines[index].sync_engine.connect()
+            except CONNECTION_ERRORS as err:
+                logger.warning("Read replica %d is unavailable, skipping it for %ss: %s",
+                               index, self.replica_retry_after, err)
+                self.replica_failures += 1
+                self._replica_down_until[index] = time.monotonic() + self.replica_retry_after
+                index = self._pick_replica()
+            else:
+                self.replica_reads += 1
+                session.info["replica"] = True
+                return connection
+        self.primary_reads += 1
+        return self._engine.sync_engine.connect()
+
+    @contextlib.asynccontextmanager
+    async def read_session(self, key: str | None = None):
+        """
+        Session for read-only work on a replica, or on the primary if there is no healthy replica or
+        ``key`` wrote within the read-your-writes window.
+
+        With replicas, where the session reads is decided by its first statement, which also connects it:
+        a request that runs none looks up no recent writes. A replica that fails to connect is skipped for
+        ``replica_retry_after`` seconds and the session moves on to the next healthy one, or to the primary.
+        Once connected, ``info["replica"]`` tells whether the session reads from a replica.
+        """
+        if self._session_maker is None:
+            raise Exception("Session is not initialized")
+        if not self._replica_engines:
+            self.primary_reads += 1
+            async with self.session() as session:
+                yield session
+            return
+        session = self._session_maker()
+        session.info["connect"] = lambda: self._connect_read(session, key)
+        try:
+            yield session
+        except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+            connection = session.info.get("connection")
+            if connection is not None:
+                await greenlet_spawn(connection.close)
+
+    def pool_stats(self) -> dict:
+        return self._engine.pool.stats()
+
+    def replica_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replica_failures": self.replica_failures,
+            "replicas": [{**engine.pool.stats(), "healthy": down_until <= now}
+                         for engine, down_until in zip(self._replica_engines, self._replica_down_until)],
+        }
 
+    async def close(self):
+        """Close every pooled connection; the manager cannot be used afterwards."""
+        if self._engine is not None:
+            await self._engine.dispose()
+        for engine in self._replica_engines:
+            await engine.dispose()
+        self._engine = None
+        self._session_maker = None
+        self._replica_engines = []
 
-sessionmanager = DatabaseSessionManager(config.DB_URL)
+
+sessionmanager = DatabaseSessionManager(
+    config.DB_URL,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+    replica_urls=config.DB_REPLICA_URLS,
+    replica_retry_after=config.DB_REPLICA_RETRY_AFTER,
+    read_your_writes=config.DB_READ_YOUR_WRITES_WINDOW,
+    recent_writes=recent_writes_store,
+    prepared_statement_cache_size=config.DB_PREPARED_STATEMENT_CACHE_SIZE,
+)
 
 
 async def get_db():
     async with sessionmanager.session() as session:
         yield session
+
+
+def get_session_factory():
+    """
+    Session factory for work that outlives the request's dependencies, such as a streaming response body,
+    which FastAPI only runs after ``get_db`` has closed its session.
+    """
+    return sessionmanager.session
+
+
+def get_read_session_factory():
+    """
+    Factory of read-only sessions, ``read_session(key)``; see ``src.services.auth.get_read_db`` for the
+    dependency that routes declare.
+    """
+    return sessionmanager.read_session
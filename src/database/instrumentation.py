@@ -0,0 +1,138 @@
+import contextvars
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from src.conf.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestQueries:
+    """SQL statements run on behalf of one request."""
+
+    statements: int = 0
+    duration: float = 0.0
+    slowest: float = 0.0
+    slowest_statement: str | None = None
+    shapes: Counter = field(default_factory=Counter)
+    # Whether a database connection was checked out, on any engine and by any of the request's sessions
+    checked_out: bool = False
+    # Set once the response headers are sent: the statements of a streamed body or a background task
+    # run later and are no longer attributed to the request
+    closed: bool = False
+
+
+current_queries: contextvars.ContextVar[RequestQueries | None] = contextvars.ContextVar("current_queries",
+                                                                                       default=None)
+
+
+class SqlInstrumentation:
+    """
+    Statement statistics collected from the cursor events of every engine.
+
+    Each statement slower than ``slow_query`` seconds is logged. Per request, the statement count, the
+    total and the slowest duration are reported in ``Server-Timing``, and a statement that ran more than
+    ``n_plus_one`` times with different parameters is logged as a likely N+1 query. Statements executed
+    with many parameter sets (``executemany`` and multi-row inserts) are one operation and never counted
+    as repeats. Requests that never checked out a database connection, served from caches alone, are
+    counted too.
+    """
+
+    def __init__(self, slow_query: float, n_plus_one: int):
+        self.slow_query = slow_query
+        self.n_plus_one = n_plus_one
+        self.requests = 0
+        self.requests_without_checkout = 0
+        self.statements = 0
+        self.duration = 0.0
+        self.slow_statements = 0
+        self.repeated_statements = 0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context.sql_started_at = time.perf_counter()
+
+    def checkout(self, dbapi_connection, connection_record, connection_proxy):
+        queries = current_queries.get()
+        if queries is not None and not queries.closed:
+            queries.checked_out = True
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context.sql_started_at
+        self.statements += 1
+        self.duration += duration
+        if duration >= self.slow_query:
+            self.slow_statements += 1
+            logger.warning("Slow statement (%.1f ms): %s", duration * 1000, statement)
+
+        queries = current_queries.get()
+        if queries is None or queries.closed:
+            return
+        queries.statements += 1
+        queries.duration += duration
+        if duration >= queries.slowest:
+            queries.slowest, queries.slowest_statement = duration, statement
+        if not context.executemany:
+            queries.shapes[statement] += 1
+
+    def finish(self, queries: RequestQueries, method: str, path: str) -> str:
+        """Close the request's statistics and return its ``Server-Timing`` header value."""
+        queries.closed = True
+        self.requests += 1
+        if not queries.checked_out:
+            self.requests_without_checkout += 1
+        for statement, count in queries.shapes.items():
+            if count > self.n_plus_one:
+                self.repeated_statements += 1
+                logger.warning("%s %s ran the same statement %d times, a likely N+1 query: %s",
+                               method, path, count, statement)
+        return (f'db;dur={queries.duration * 1000:.2f};desc="{queries.statements} statements", '
+                f'db-slowest;dur={queries.slowest * 1000:.2f}')
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "requests_without_checkout": self.requests_without_checkout,
+            "statements": self.statements,
+            "duration_ms": self.duration * 1000,
+            "slow_statements": self.slow_statements,
+            "repeated_statements": self.repeated_statements,
+        }
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware collecting the SQL statements of each HTTP request and reporting them in ``Server-Timing``."""
+
+    def __init__(self, app, instrumentation: SqlInstrumentation):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = RequestQueries()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and not queries.closed:
+                timing = self.instrumentation.finish(queries, scope["method"], scope["path"])
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        token = current_queries.set(queries)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_queries.reset(token)
+
+
+sql_instrumentation = SqlInstrumentation(config.SQL_SLOW_QUERY_MS / 1000, config.SQL_N_PLUS_ONE_THRESHOLD)
+event.listen(Engine, "before_cursor_execute", sql_instrumentation.before_cursor_execute)
+event.listen(Engine, "after_cursor_execute", sql_instrumentation.after_cursor_execute)
+event.listen(Pool, "checkout", sql_instrumentation.checkout)
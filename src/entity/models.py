@@ -1,5 +1,5 @@
 from datetime import date
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, Index, extract, func, literal_column
 from sqlalchemy.orm import Mapped, DeclarativeBase, mapped_column, relationship
 
 
@@ -7,6 +7,11 @@ class Base(DeclarativeBase):
     pass
 
 
+def month_day(column):
+    # MMDD as an integer. The factor is rendered inline so queries repeat the indexed expression verbatim
+    return extract("month", column) * literal_column("100") + extract("day", column)
+
+
 class Contacts(Base):
     __tablename__ = "contacts"
     id = Column(Integer, primary_key=True, index=True)
@@ -20,6 +25,27 @@ class Contacts(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
     user: Mapped["User"] = relationship("User", backref="contacts", lazy="joined")
 
+    __table_args__ = (
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_id_updated_at", "user_id", " updated_at"),
+        Index("ix_contacts_user_id_birthday_md", "user_id", month_day(birthday)),
+        *(Index(f"ix_contacts_{name}_trgm", name, postgresql_using="gin", postgresql_ops={name: "gin_trgm_ops"})
+          .ddl_if(dialect="postgresql") for name in ("full_name", "email", "phone_number")),
+    )
+
+
+class ContactTombstone(Base):
+    """A deleted contact, kept so sync clients can learn about the deletion."""
+    __tablename__ = "contact_tombstones"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    contact_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    deleted_at: Mapped[date] = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_contact_tombstones_user_id_id", "user_id", "id"),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
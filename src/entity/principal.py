@@ -0,0 +1,50 @@
+import json
+from dataclasses import dataclass
+
+PRINCIPAL_SCHEMA_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Immutable snapshot of an authenticated user.
+
+    Carries only the fields routes need, so it is cheap to cache and safe to share between requests,
+    unlike a SQLAlchemy ``User`` instance bound to a session.
+    """
+    id: int
+    email: str
+    username: str
+    avatar: str | None
+    verified: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, email=user.email, username=user.username, avatar=user.avatar,
+                   verified=bool(user.verified))
+
+    def dumps(self) -> bytes:
+        """
+        Encode as a compact JSON array prefixed with the schema version.
+
+        >>> Principal(1, "a@b.com", "ab", None, True).dumps()
+        b'[1,1,"a@b.com","ab",null,true]'
+        """
+        return json.dumps([PRINCIPAL_SCHEMA_VERSION, self.id, self.email, self.username, self.avatar, self.verified],
+                          separators=(",", ":")).encode()
+
+    @classmethod
+    def loads(cls, data: bytes) -> "Principal | None":
+        """
+        Decode a value written by :meth:`dumps`.
+
+        Returns ``None`` for payloads of another schema version or in another format, so callers can
+        treat them as a cache miss.
+        """
+        try:
+            version, *fields = json.loads(data)
+        except (ValueError, TypeError):
+            return None
+        if version != PRINCIPAL_SCHEMA_VERSION or len(fields) != 5:
+            return None
+        return cls(*fields)
@@ -1,47 +1,290 @@
-from sqlalchemy import select
+import functools
+import logging
+from datetime import date, datetime, timedelta
+from itertools import takewhile
+from typing import AsyncIterator, Sequence
+
+from redis.exceptions import RedisError
+from sqlalchemy import (RowMapping, String, and_, bindparam, case, delete, func, insert, or_, select, type_coerce,
+                        update)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.entity.models import Contacts, User
+from src.database.db import sessionmanager
+from src.entity.models import Contacts, ContactTombstone, month_day
+from src.entity.principal import Principal
 from src.schemas.contacts import ContactSchema, ContactUpdateSchema
+from src.services.page_cache import contacts_page_cache
+
+logger = logging.getLogger(__name__)
+
+CONTACT_FIELDS = ("id", "full_name", "email", "phone_number", "birthday")
+# The contact fields plus its last modification time, which versions the row for ETags
+CONTACT_VERSION_FIELDS = (*CONTACT_FIELDS, "updated_at")
+
+
+async def _contacts_changed(user: Principal):
+    # The user's next reads go to the primary for a while and none of their cached pages is served again.
+    # The write is recorded before the bump, so a reader seeing the new version also sees a recent write.
+    # The write is committed already, so a Redis outage must not fail it; pages cached before it then live
+    # until they expire
+    await sessionmanager.record_write(user.email)
+    try:
+        await contacts_page_cache.bump(user.id)
+    except (RedisError, OSError) as err:
+        logger.warning("Could not invalidate the cached contact pages of user %s: %s", user.id, err)
+
+
+def _select_contacts(fields: Sequence[str] | None):
+    # A sparse field list selects plain columns: no ORM instances and no join to users
+    if fields is None:
+        return select(Contacts)
+    return select(*(getattr(Contacts, field) for field in fields))
+
+
+# The statements of the hottest reads are built once per field list and executed with bound parameters,
+# so a call neither rebuilds the construct nor recomputes its compiled-cache key
+@functools.lru_cache(maxsize=256)
+def _contacts_page_stmt(fields: tuple[str, ...] | None):
+    return (_select_contacts(fields).where(Contacts.user_id == bindparam("user_id"))
+            .offset(bindparam("offset")).limit(bindparam("limit")))
+
+
+@functools.lru_cache(maxsize=256)
+def _contacts_after_stmt(fields: tuple[str, ...] | None, after: bool):
+    stmt = _select_contacts(fields).where(Contacts.user_id == bindparam("user_id"))
+    if after:
+        stmt = stmt.where(Contacts.id > bindparam("after_id"))
+    return stmt.order_by(Contacts.id).limit(bindparam("limit"))
+
+
+@functools.lru_cache(maxsize=256)
+def _contact_stmt(fields: tuple[str, ...] | None, for_update: bool):
+    stmt = _select_contacts(fields).where(Contacts.id == bindparam("contact_id"),
+                                          Contacts.user_id == bindparam("user_id"))
+    if for_update:
+        # Holds the row until the caller commits, e.g. between checking If-Match and writing
+        stmt = stmt.with_for_update()
+    return stmt
+
+
+def _fields_key(fields: Sequence[str] | None) -> tuple[str, ...] | None:
+    return None if fields is None else tuple(fields)
+
+
+async def get_contacts(limit: int, offset: int, db: AsyncSession, user: Principal,
+                       fields: Sequence[str] | None = None):
+    contacts = await db.execute(_contacts_page_stmt(_fields_key(fields)),
+                                {"user_id": user.id, "offset": offset, "limit": limit})
+    return contacts.scalars().all() if fields is None else contacts.mappings().all()
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_contacts(q: str, limit: int, offset: int, db: AsyncSession, user: Principal,
+                          fields: Sequence[str] | None = None):
+    # ILIKE on Postgres, served by the trigram GIN indexes; lower() LIKE lower() on SQLite. Contacts with
+    # a field starting with `q` rank above those that only contain it
+    escaped = _like_escape(q)
+    columns = (Contacts.full_name, Contacts.email, Contacts.phone_number)
+    prefix = or_(*(column.ilike(f"{escaped}%", escape="\\") for column in columns))
+    stmt = (_select_contacts(fields).filter_by(user_id=user.id)
+            .where(or_(*(column.ilike(f"%{escaped}%", escape="\\") for column in columns)))
+            .order_by(case((prefix, 0), else_=1), Contacts.full_name, Contacts.id)
+            .offset(offset).limit(limit))
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all() if fields is None else contacts.mappings().all()
+
+
+async def get_contacts_state(db: AsyncSession, user: Principal):
+    # Changes whenever a contact of the user is created, updated or deleted; versions whole pages for ETags
+    stmt = (select(func.count(), func.max(Contacts.id), func.max(Contacts.updated_at))
+            .where(Contacts.user_id == user.id))
+    state = await db.execute(stmt)
+    return tuple(state.one())
+
+
+def sync_version(db: AsyncSession):
+    # SQLite stores CURRENT_TIMESTAMP as text without fractional seconds while bound datetimes carry them,
+    # so equal timestamps would never compare equal; there the stored text is compared as it is
+    if db.bind.dialect.name == "sqlite":
+        return type_coerce(Contacts.updated_at, String)
+    return Contacts.updated_at
+
 
+def _seconds_ago(db: AsyncSession, seconds: float):
+    # The database clock, in the format the timestamp columns are stored in
+    if db.bind.dialect.name == "sqlite":
+        return func.datetime("now", f"-{seconds} seconds")
+    return func.now() - timedelta(seconds=seconds)
 
-async def get_contacts(limit: int, offset: int, db: AsyncSession, user: User):
-    stmt = select(Contacts).filter_by(user=user).offset(offset).limit(limit)
+
+async def get_changes(after: tuple | None, after_tombstone: int | None, limit: int, db: AsyncSession,
+                      user: Principal, margin: float):
+    """
+    Contacts created or updated after the ``(version, id)`` position ``after``, oldest first, and the
+    ``(tombstone id, contact id)`` pairs of contacts deleted after tombstone ``after_tombstone``.
+
+    Without ``after_tombstone`` no deletions are returned, only the latest tombstone id to continue from.
+    Each row carries its ``version``, whose ``str()`` is the value to resume from.
+
+    Versions are the start times of the writing transactions and tombstone ids are taken before commit,
+    so a write still in flight can land behind a position already handed out. Only changes older than
+    ``margin`` seconds, which should exceed the longest write transaction, are returned; newer ones
+    follow in a later sync.
+
+    :raises ValueError: If the version in ``after`` is malformed.
+    """
+    version = sync_version(db)
+    settled = _seconds_ago(db, margin)
+    stmt = (select(*(getattr(Contacts, field) for field in CONTACT_VERSION_FIELDS), version.label("version"))
+            .filter_by(user_id=user.id).where(version <= settled))
+    if after is not None:
+        # Keyset on the (user_id, updated_at) index; the id breaks ties between equal timestamps
+        since = after[0] if isinstance(version.type, String) else datetime.fromisoformat(after[0])
+        stmt = stmt.where(or_(version > since, and_(version == since, Contacts.id > after[1])))
+    changed = await db.execute(stmt.order_by(version, Contacts.id).limit(limit))
+    changed = changed.mappings().all()
+
+    if after_tombstone is None:
+        # Continue from just before the oldest tombstone that is not settled yet
+        stmt = (select(func.max(ContactTombstone.id),
+                       func.min(case((ContactTombstone.deleted_at > settled, ContactTombstone.id))))
+                .filter_by(user_id=user.id))
+        latest, unsettled = (await db.execute(stmt)).one()
+        return changed, [], unsettled - 1 if unsettled is not None else latest or 0
+    stmt = (select(ContactTombstone.id, ContactTombstone.contact_id, ContactTombstone.deleted_at <= settled)
+            .filter_by(user_id=user.id).where(ContactTombstone.id > after_tombstone)
+            .order_by(ContactTombstone.id).limit(limit))
+    deleted = await db.execute(stmt)
+    # Ids are not in deletion order, so stop at the first tombstone that is not settled yet
+    deleted = [(tombstone_id, contact_id)
+               for tombstone_id, contact_id, _ in takewhile(lambda row: row[2], deleted.all())]
+    return changed, deleted, deleted[-1][0] if deleted else after_tombstone
+
+
+async def purge_tombstones(retention: float, db: AsyncSession) -> int:
+    """Delete the tombstones older than ``retention`` seconds and return how many were deleted."""
+    stmt = delete(ContactTombstone).where(ContactTombstone.deleted_at < _seconds_ago(db, retention))
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount
+
+
+async def get_contacts_after(limit: int, after_id: int | None, db: AsyncSession, user: Principal,
+                             fields: Sequence[str] | None = None):
+    # Keyset pagination: seeks on the (user_id, id) index instead of reading and skipping `offset` rows
+    stmt = _contacts_after_stmt(_fields_key(fields), after_id is not None)
+    contacts = await db.execute(stmt, {"user_id": user.id, "after_id": after_id, "limit": limit})
+    return contacts.scalars().all() if fields is None else contacts.mappings().all()
+
+
+async def stream_contacts(db: AsyncSession, user: Principal, batch_size: int,
+                          fields: Sequence[str] = CONTACT_FIELDS) -> AsyncIterator[Sequence[RowMapping]]:
+    # Reads through a server-side cursor and hands out `batch_size` rows at a time, so memory does not
+    # depend on the size of the contact book
+    stmt = (_select_contacts(fields).filter_by(user_id=user.id).order_by(Contacts.id)
+            .execution_options(yield_per=batch_size))
+    result = await db.stream(stmt)
+    async for rows in result.mappings().partitions():
+        yield rows
+
+
+async def get_upcoming_birthdays(days: int, limit: int, db: AsyncSession, user: Principal, today: date):
+    # Compares MMDD values on the (user_id, month_day(birthday)) index; a window running past
+    # December 31st becomes two ranges, the rest of this year and the start of the next one
+    start, end = today.month * 100 + today.day, today + timedelta(days=days)
+    end = end.month * 100 + end.day
+    birthday = month_day(Contacts.birthday)
+    if days >= 365:
+        window = Contacts.birthday.is_not(None)
+    elif start <= end:
+        window = birthday.between(start, end)
+    else:
+        window = or_(birthday >= start, birthday <= end)
+    stmt = (select(Contacts).filter_by(user_id=user.id).where(window)
+            .order_by(case((birthday >= start, 0), else_=1), birthday, Contacts.id).limit(limit))
     contacts = await db.execute(stmt)
     return contacts.scalars().all()
 
 
-async def get_contact(contact_id: int, db: AsyncSession, user: User):
-    stmt = select(Contacts).filter_by(id=contact_id, user=user)
-    contact = await db.execute(stmt)
-    return contact.scalar_one_or_none()
+async def get_contacts_by_ids(contact_ids: Sequence[int], db: AsyncSession, user: Principal,
+                              fields: Sequence[str] = CONTACT_FIELDS):
+    stmt = _select_contacts(fields).filter_by(user_id=user.id).where(Contacts.id.in_(contact_ids))
+    contacts = await db.execute(stmt)
+    return contacts.mappings().all()
+
 
+async def get_contact(contact_id: int, db: AsyncSession, user: Principal, fields: Sequence[str] | None = None,
+                      for_update: bool = False):
+    contact = await db.execute(_contact_stmt(_fields_key(fields), for_update),
+                               {"contact_id": contact_id, "user_id": user.id})
+    return contact.scalar_one_or_none() if fields is None else contact.mappings().one_or_none()
 
-async def create_contact(body: ContactSchema, db: AsyncSession, user: User):
-    contact = Contacts(**body.model_dump(exclude_unset=True), user=user)
+
+async def create_contact(body: ContactSchema, db: AsyncSession, user: Principal):
+    contact = Contacts(**body.model_dump(exclude_unset=True), user_id=user.id)
     db.add(contact)
     await db.commit()
     await db.refresh(contact)
+    await _contacts_changed(user)
     return contact
 
 
-async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSession, user: User):
-    stmt = select(Contacts).filter_by(id=contact_id, user=user)
-    result = await db.execute(stmt)
-    contact = result.scalar_one_or_none()
-    if contact:
-        contact.phone_number = body.phone_number
-        contact.birthday = body.birthday
-        await db.commit()
-        await db.refresh(contact)
+async def create_contacts(bodies: Sequence[ContactSchema], db: AsyncSession, user: Principal,
+                          chunk_size: int) -> tuple[list[tuple[int, int]], list[int]]:
+    """
+    Insert contacts with multi-row ``INSERT ... ON CONFLICT DO NOTHING RETURNING``, ``chunk_size`` rows each.
+
+    Returns ``(index, id)`` pairs of the inserted rows and the indexes of the rows skipped because their
+    email or phone number is already taken, by an existing contact or an earlier row of the batch.
+    """
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    # Executed with a list of parameter sets, the statement is compiled once and sent as multi-row
+    # VALUES pages of `chunk_size` rows ("insertmanyvalues")
+    stmt = (insert(Contacts).on_conflict_do_nothing()
+            .returning(Contacts.id, Contacts.email, Contacts.phone_number)
+            .execution_options(insertmanyvalues_page_size=chunk_size))
+    rows = [{**body.model_dump(), "user_id": user.id} for body in bodies]
+    result = await db.execute(stmt, rows)
+    # Rows skipped by ON CONFLICT return nothing, so match the returned ones back by their unique columns
+    inserted = {(email, phone_number): contact_id for contact_id, email, phone_number in result.all()}
+    created, conflicts = [], []
+    for index, row in enumerate(rows):
+        contact_id = inserted.pop((row["email"], row["phone_number"]), None)
+        if contact_id is None:
+            conflicts.append(index)
+        else:
+            created.append((index, contact_id))
+    await db.commit()
+    if created:
+        await _contacts_changed(user)
+    return created, conflicts
+
+
+async def update_contact(contact_id: int, body: ContactUpdateSchema, db: AsyncSession, user: Principal):
+    # One UPDATE ... RETURNING instead of SELECT, UPDATE and a refresh
+    stmt = (update(Contacts).filter_by(id=contact_id, user_id=user.id)
+            .values(phone_number=body.phone_number, birthday=body.birthday)
+            .returning(*(getattr(Contacts, field) for field in CONTACT_VERSION_FIELDS)))
+    contact = await db.execute(stmt)
+    contact = contact.mappings().one_or_none()
+    await db.commit()
+    if contact is not None:
+        await _contacts_changed(user)
     return contact
 
 
-async def delete_contact(contact_id: int, db: AsyncSession, user: User):
-    stmt = select(Contacts).filter_by(id=contact_id, user=user)
+async def delete_contact(contact_id: int, db: AsyncSession, user: Principal):
+    stmt = delete(Contacts).filter_by(id=contact_id, user_id=user.id).returning(Contacts.id)
     contact = await db.execute(stmt)
     contact = contact.scalar_one_or_none()
-    if contact:
-        await db.delete(contact)
-        await db.commit()
+    if contact is not None:
+        # In the same transaction, so sync clients see either both the row and no tombstone or neither
+        await db.execute(insert(ContactTombstone).values(contact_id=contact, user_id=user.id))
+    await db.commit()
+    if contact is not None:
+        await _contacts_changed(user)
     return contact
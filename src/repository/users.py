@@ -1,16 +1,25 @@
-from sqlalchemy import select
+import logging
+
+from redis.exceptions import RedisError
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
-from src.database.db import get_db
+from src.database.db import get_db, sessionmanager
 from src.entity.models import User
+from src.entity.principal import Principal
 from src.schemas.user import UserSchema
+from src.services.cache import user_cache
 from libgravatar import Gravatar
 
+logger = logging.getLogger(__name__)
+
+# Built once: behind every cache miss of the current-user lookup
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
 
 async def get_user_by_email(email: str, db: AsyncSession = Depends(get_db)):
-    stmt = select(User).filter_by(email=email)
-    user = await db.execute(stmt)
+    user = await db.execute(USER_BY_EMAIL, {"email": email})
     user = user.scalar_one_or_none()
     return user
 
@@ -27,24 +36,36 @@ async def create_user(body: UserSchema, db: AsyncSession = Depends(get_db)):
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)  # Refresh the user with the generated id
+    await sessionmanager.record_write(new_user.email)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: AsyncSession):
-    user.refresh_token = token
-    await db.commit()
+async def _invalidate_user(email: str, user: User):
+    # The write is committed already; a Redis outage must not fail it. The entry then goes stale for at
+    # most USER_CACHE_TTL
+    try:
+        await user_cache.invalidate(email, Principal.from_user(user))
+    except (RedisError, OSError) as err:
+        logger.warning("Could not invalidate the cached user %s: %s", email, err)
 
 
 async def confirmed_email(email: str, db: AsyncSession) -> None:
-    user = await get_user_by_email(email, db)
-    user.verified = True
+    stmt = update(User).filter_by(email=email).values(verified=True).returning(User)
+    user = await db.execute(stmt)
+    user = user.scalar_one_or_none()
     await db.commit()
+    if user is not None:
+        await sessionmanager.record_write(email)
+        await _invalidate_user(email, user)
 
 
 async def update_avatar_url(email: str, url: str | None, db: AsyncSession) -> User:
-    user = await get_user_by_email(email, db)
-    user.avatar = url
+    stmt = update(User).filter_by(email=email).values(avatar=url).returning(User)
+    user = await db.execute(stmt)
+    user = user.scalar_one_or_none()
     await db.commit()
-    await db.refresh(user)
+    if user is not None:
+        await sessionmanager.record_write(email)
+        await _invalidate_user(email, user)
 
     return user
@@ -3,13 +3,14 @@ from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredent
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
+from src.entity.principal import Principal
 from src.repository import users as repository_users
 from src.services.auth import auth_service
 from src.schemas.user import UserSchema, TokenSchema, UserResponse, RequestEmail
 from src.services.email import send_email
 
 router = APIRouter(prefix='/auth', tags=['auth'])
-get_refresh_token = HTTPBearer
+get_refresh_token = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -17,7 +18,7 @@ async def signup(body: UserSchema, bt: BackgroundTasks, request: Request, db: As
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
     bt.add_task(send_email, new_user.email, new_user.username, str(request.base_url))
     return new_user
@@ -30,29 +31,24 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not verified")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
-    access_token = await auth_service.create_access_token(data={"sub": user.email})
+    access_token = await auth_service.create_access_token(data={"sub": user.email},
+                                                          principal=Principal.from_user(user))
     refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.get('/refresh_token', response_model=TokenSchema)
 async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(get_refresh_token),
                         db: AsyncSession = Depends(get_db)):
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
+    email, refresh_token = await auth_service.rotate_refresh_token(credentials.credentials)
+    user = await auth_service.get_principal(email, db)
+    if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-    access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    user.refresh_token = refresh_token
-    await repository_users.update_token(user, refresh_token, db)
+    access_token = await auth_service.create_access_token(data={"sub": email}, principal=user)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
@@ -1,68 +1,459 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Path, Query
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date
+from typing import AsyncIterator, Literal
+
+from fastapi import (APIRouter, HTTPException, Depends, status, Path, Query, Response, Body, BackgroundTasks,
+                     UploadFile, File, Header)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.db import get_db
-from src.entity.models import User
+from src.conf.config import config
+from src.database.db import get_db, get_session_factory, sessionmanager
+from src.entity.principal import Principal
 from src.repository import contacts as repository_contents
 
-from src.schemas.contacts import ContactSchema, ContactUpdateSchema, ContactResponse
-from src.services.auth import auth_service
+from src.schemas.contacts import (ContactSchema, ContactUpdateSchema, ContactResponse, ContactBulkResponse,
+                                  ImportJobResponse, ContactChangesResponse, ContactBatchResponse)
+from src.services.auth import auth_service, get_read_db
+from src.services.cursor import encode_cursor, decode_cursor
+from src.services.etag import make_etag, etag_matches
+from src.services.imports import ImportFormat, import_service
+from src.services.page_cache import contacts_page_cache
 
 router = APIRouter(prefix='/contacts', tags=['contacts'])
 
+BATCH_MAX_IDS = 500
+
+CONTACT_LIST = TypeAdapter(list[ContactResponse])
+
+FIELDS_QUERY = Query(None, description="Comma-separated subset of "
+                                       f"{', '.join(repository_contents.CONTACT_FIELDS)} to return flat, "
+                                       "without the embedded user. `id` is always included.")
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in repository_contents.CONTACT_FIELDS]
+    if unknown or not names:
+        detail = f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested"
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+    return ["id"] + [name for name in dict.fromkeys(names) if name != "id"]
+
+
+def parse_ids(ids: str) -> list[int]:
+    try:
+        contact_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="IDs must be integers")
+    contact_ids = list(dict.fromkeys(contact_ids))
+    if not contact_ids or len(contact_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Between 1 and {BATCH_MAX_IDS} IDs can be requested at once")
+    return contact_ids
+
+
+def sparse_json(content: list[dict] | dict) -> bytes:
+    # Plain rows go straight to JSON, skipping response model validation of every item
+    return json.dumps(content, default=date.isoformat, separators=(",", ":")).encode()
+
+
+def sparse_response(content: list[dict] | dict, headers: dict | None = None) -> Response:
+    return Response(sparse_json(content), media_type="application/json", headers=headers)
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def export_chunks(session_factory, user: Principal, format: str) -> AsyncIterator[str]:
+    fields = repository_contents.CONTACT_FIELDS
+    async with session_factory() as db:
+        if format == "csv":
+            yield ",".join(fields) + "\r\n"
+        async for rows in repository_contents.stream_contacts(db, user, config.CONTACTS_EXPORT_BATCH_SIZE, fields):
+            if format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows([row[field] for field in fields] for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(row), default=date.isoformat, separators=(",", ":")) + "\n"
+                              for row in rows)
+
+
+def parse_sync_cursor(cursor: str | None) -> tuple[tuple[str, int] | None, int | None]:
+    position = decode_cursor(cursor) if cursor else {}
+    after = (position.get("v"), position.get("id")) if "v" in position else None
+    after_tombstone = position.get("d")
+    issued_at = position.get("t")
+    if after is not None and not (isinstance(after[0], str) and isinstance(after[1], int)) \
+            or after_tombstone is not None and not isinstance(after_tombstone, int) \
+            or issued_at is not None and not isinstance(issued_at, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    # Deletions not yet returned with the cursor are up to two safety margins older than it; once they
+    # may have been purged, only a full sync is complete
+    max_age = config.CONTACTS_TOMBSTONE_RETENTION - 2 * config.CONTACTS_SYNC_SAFETY_MARGIN
+    if cursor and (issued_at is None or time.time() - issued_at > max_age):
+        raise HTTPException(status_code=status.HTTP_410_GONE,
+                            detail="Cursor is too old, sync again without a cursor")
+    return after, after_tombstone
+
+
+def contact_etag(contact, columns: list[str] | None, user: Principal) -> str:
+    # The full representation embeds the owner, so their profile is part of its version
+    return make_etag([contact[field] for field in repository_contents.CONTACT_VERSION_FIELDS], columns,
+                     None if columns is not None else user.dumps().decode())
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+async def save_upload(file: UploadFile) -> str:
+    # The upload is closed together with the request, before background tasks run, so keep a copy.
+    # Disk I/O runs in a thread so a large file does not block the event loop
+    copy = await asyncio.to_thread(tempfile.NamedTemporaryFile, prefix="contacts-import-", delete=False)
+    try:
+        size = 0
+        while chunk := await file.read(1024 * 1024):
+            size += len(chunk)
+            if size > config.CONTACTS_IMPORT_MAX_BYTES:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large")
+            await asyncio.to_thread(copy.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(copy.close)
+        await asyncio.to_thread(os.unlink, copy.name)
+        raise
+    await asyncio.to_thread(copy.close)
+    return copy.name
+
 
 @router.get("/", response_model=list[ContactResponse])
 async def get_all_contacts(limit: int = Query(10, ge=10, le=500), offset: int = Query(0, ge=0),
-                           db: AsyncSession = Depends(get_db),
-                           user: User = Depends(auth_service.get_current_user)):
+                           cursor: str | None = Query(None), q: str | None = Query(None, min_length=1, max_length=100),
+                           fields: str | None = FIELDS_QUERY, if_none_match: str | None = Header(None),
+                           db: AsyncSession = Depends(get_read_db),
+                           user: Principal = Depends(auth_service.get_current_principal)):
     """
     Retrieve all contacts with pagination support.
 
     This endpoint retrieves a list of contacts for the authenticated user,
     with support for pagination through `limit` and `offset` query parameters.
 
+    Passing `cursor` switches to keyset pagination, whose cost does not grow with the page depth:
+    start with an empty `cursor=` and pass the `X-Next-Cursor` response header of each page to get
+    the next one. The header is absent on the last page. `offset` is ignored in this mode.
+
+    Passing `q` searches the full name, email and phone number for that text, case-insensitively; contacts
+    with a field starting with it come first. Search results are paginated with `limit` and `offset`.
+
+    Passing `fields` returns only those contact fields as flat objects; the owner is not joined or embedded,
+    which makes large pages considerably smaller and cheaper to produce.
+
+    Every page carries an `ETag` that changes with any change to the user's contacts. Sending it back in
+    `If-None-Match` gets a 304 without the page being read. Pages are cached until the user's contacts
+    change, so repeated reads are usually served without a database query.
+
     :param limit: The maximum number of contacts to return (default is 10, minimum is 10, maximum is 500).
     :type limit: int
     :param offset: The number of contacts to skip before starting to collect the result set (default is 0, minimum is 0).
     :type offset: int
+    :param cursor: Opaque position returned by the previous page in keyset mode.
+    :type cursor: str | None
+    :param q: Text to search for in the full name, email and phone number.
+    :type q: str | None
+    :param fields: Comma-separated contact fields for a flat, sparse representation.
+    :type fields: str | None
+    :param if_none_match: ETags of pages the client already has.
+    :type if_none_match: str | None
     :param db: Database session dependency.
     :type db: AsyncSession
-    :param user: The current authenticated user.
-    :type user: User
+    :param user: The current authenticated user, taken from the token claims when it carries them.
+    :type user: Principal
+    :raises HTTPException: If `q` and `cursor` are combined or the cursor is invalid, a 400 status code is returned.
     :return: A list of contacts.
     :rtype: list[ContactResponse]
     """
-    contacts = await repository_contents.get_contacts(limit, offset, db, user)
-    return contacts
+    columns = parse_fields(fields)
+    if q is not None and cursor is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search does not support cursor")
+    after_id = decode_cursor(cursor).get("id") if cursor else None
+    if after_id is not None and not isinstance(after_id, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    owner = None if columns is not None else user.dumps().decode()
+    key = contacts_page_cache.key(limit, offset, cursor, q, columns, owner)
+    version, cached = await contacts_page_cache.get(user.id, key)
+    if cached is not None:
+        etag, headers, body = cached
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(body, media_type="application/json", headers=headers)
+
+    # Read the state before the page: a write in between then only makes the ETag stale, never too new
+    state = await repository_contents.get_contacts_state(db, user)
+    # A write bumps the version only after recording itself as recent, so a replica read under a version
+    # that is not recent any more is in sync with it (given the window exceeds the lag). Otherwise the
+    # replica, chosen when the session connected and possibly before the write, may miss it: the page is
+    # served as it is, without an ETag and without being cached
+    maybe_stale = db.info.get("replica", False) and await sessionmanager.wrote_recently(user.email)
+    headers = {}
+    if not maybe_stale:
+        etag = make_etag(state, key)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        headers["ETag"] = etag
+    if q is not None:
+        contacts = await repository_contents.search_contacts(q, limit, offset, db, user, columns)
+    elif cursor is None:
+        contacts = await repository_contents.get_contacts(limit, offset, db, user, columns)
+    else:
+        contacts = await repository_contents.get_contacts_after(limit, after_id, db, user, columns)
+        if len(contacts) == limit:
+            last_id = contacts[-1].id if columns is None else contacts[-1]["id"]
+            headers["X-Next-Cursor"] = encode_cursor({"id": last_id})
+    if columns is not None:
+        body = sparse_json([dict(row) for row in contacts])
+    else:
+        body = CONTACT_LIST.dump_json(CONTACT_LIST.validate_python(contacts, from_attributes=True))
+    if not maybe_stale:
+        await contacts_page_cache.set(user.id, version, key, etag, headers, body)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_contacts(format: Literal["ndjson", "csv"] = Query("ndjson"),
+                          session_factory=Depends(get_session_factory),
+                          user: Principal = Depends(auth_service.get_current_principal)):
+    """
+    Export all contacts of the authenticated user.
+
+    The contacts are streamed as they are read from the database, one JSON object per line or one CSV row
+    each, so books of any size can be downloaded in a single request.
+
+    :param format: Either `ndjson` (default) or `csv`.
+    :type format: str
+    :param session_factory: Creates the session the stream reads from once the response has started.
+    :type session_factory: Callable
+    :param user: The current authenticated user, taken from the token claims when it carries them.
+    :type user: Principal
+    :return: The contacts in the requested format.
+    :rtype: StreamingResponse
+    """
+    return StreamingResponse(export_chunks(session_factory, user, format), media_type=EXPORT_MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'})
+
+
+@router.get("/batch", response_model=ContactBatchResponse)
+async def get_contacts_batch(ids: str = Query(description=f"Comma-separated IDs, at most {BATCH_MAX_IDS}."),
+                             fields: str | None = FIELDS_QUERY, db: AsyncSession = Depends(get_read_db),
+                             user: Principal = Depends(auth_service.get_current_principal)):
+    """
+    Retrieve several contacts by their IDs in one request.
+
+    Contacts are returned in the order of `ids`; IDs that do not exist or belong to another user are listed
+    in `not_found`.
+
+    :param ids: Comma-separated contact IDs.
+    :type ids: str
+    :param fields: Comma-separated contact fields for a flat, sparse representation.
+    :type fields: str | None
+    :param db: Database session dependency.
+    :type db: AsyncSession
+    :param user: The current authenticated user, taken from the token claims when it carries them.
+    :type user: Principal
+    :raises HTTPException: If `ids` is malformed or lists too many IDs, a 400 status code is returned.
+    :return: The contacts found and the IDs that were not.
+    :rtype: ContactBatchResponse
+    """
+    contact_ids = parse_ids(ids)
+    columns = parse_fields(fields)
+    # One `id IN (...)` query; the owner is the current user, so nothing has to be joined
+    rows = await repository_contents.get_contacts_by_ids(contact_ids, db, user,
+                                                         columns or repository_contents.CONTACT_FIELDS)
+    found = {row["id"]: row for row in rows}
+    contacts = [found[contact_id] for contact_id in contact_ids if contact_id in found]
+    not_found = [contact_id for contact_id in contact_ids if contact_id not in found]
+    if columns is not None:
+        return sparse_response({"contacts": [dict(row) for row in contacts], "not_found": not_found})
+    return {"contacts": [{**row, "user": user} for row in contacts], "not_found": not_found}
+
+
+@router.get("/changes", response_model=ContactChangesResponse)
+async def get_changes(cursor: str | None = Query(None), limit: int = Query(100, ge=1, le=500),
+                      db: AsyncSession = Depends(get_read_db),
+                      user: Principal = Depends(auth_service.get_current_principal)):
+    """
+    Retrieve the contacts changed and deleted since a previous sync.
+
+    Without `cursor` every contact is returned, oldest change first, over as many requests as needed. Pass
+    the returned `cursor` to the next request and keep going while `has_more` is true; later syncs with the
+    last cursor then return only what was created, updated (`changed`) or deleted (`deleted` IDs) since.
+    A change is returned a few seconds after it was made, once no write that started before it can still
+    commit. Deletions are kept for a limited time; a cursor older than that has to be replaced by a full
+    sync.
+
+    :param cursor: Opaque position returned by the previous sync.
+    :type cursor: str | None
+    :param limit: The maximum number of changed and of deleted contacts to return (default is 100, maximum is 500).
+    :type limit: int
+    :param db: Database session dependency.
+    :type db: AsyncSession
+    :param user: The current authenticated user, taken from the token claims when it carries them.
+    :type user: Principal
+    :raises HTTPException: If the cursor is invalid, a 400 status code is returned; if it is older than
+        deletions are kept for, a 410, after which the client has to sync again from scratch.
+    :return: The changes, the cursor to continue from and whether more are waiting.
+    :rtype: ContactChangesResponse
+    """
+    after, after_tombstone = parse_sync_cursor(cursor)
+    issued_at = int(time.time())
+    try:
+        changed, deleted, tombstone = await repository_contents.get_changes(
+            after, after_tombstone, limit, db, user, config.CONTACTS_SYNC_SAFETY_MARGIN)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if changed:
+        position = {"v": str(changed[-1]["version"]), "id": changed[-1]["id"]}
+    else:
+        position = {"v": after[0], "id": after[1]} if after is not None else {}
+    return {
+        "changed": changed,
+        "deleted": [contact_id for _, contact_id in deleted],
+        "cursor": encode_cursor({**position, "d": tombstone, "t": issued_at}),
+        "has_more": len(changed) == limit or len(deleted) == limit,
+    }
+
+
+@router.get("/birthdays", response_model=list[ContactResponse])
+async def get_upcoming_birthdays(days: int = Query(7, ge=0, le=365), limit: int = Query(100, ge=1, le=500),
+                                 db: AsyncSession = Depends(get_read_db),
+                                 user: Principal = Depends(auth_service.get_current_principal)):
+    """
+    Retrieve contacts whose birthday falls within the next `days` days.
+
+    The window starts today and may run into the next year; contacts are ordered by how soon their
+    birthday comes.
+
+    :param days: Length of the window after today (default is 7, maximum is 365).
+    :type days: int
+    :param limit: The maximum number of contacts to return (default is 100, maximum is 500).
+    :type limit: int
+    :param db: Database session dependency.
+    :type db: AsyncSession
+    :param user: The current authenticated user, taken from the token claims when it carries them.
+    :type user: Principal
+    :return: The contacts with upcoming birthdays.
+    :rtype: list[ContactResponse]
+    """
+    return await repository_contents.get_upcoming_birthdays(days, limit, db, user, date.today())
+
+
+@router.post("/import", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def import_contacts(background_tasks: BackgroundTasks, file: UploadFile = File(),
+                          format: ImportFormat | None = Query(None),
+                          session_factory=Depends(get_session_factory),
+                          user: Principal = Depends(auth_service.get_current_user)):
+    """
+    Import contacts from a CSV or vCard file.
+
+    The file is stored and imported in the background; poll `GET /contacts/import/{job_id}` for the number of
+    processed, created and failed rows. CSV files use the columns of the CSV export.
+
+    :param background_tasks: Runs the import after the response is sent.
+    :type background_tasks: BackgroundTasks
+    :param file: The uploaded file.
+    :type file: UploadFile
+    :param format: `csv` or `vcard`; guessed from the file name when omitted.
+    :type format: str | None
+    :param session_factory: Creates the sessions the import writes with.
+    :type session_factory: Callable
+    :param user: The current authenticated user.
+    :type user: Principal
+    :raises HTTPException: 413 if the file is larger than `CONTACTS_IMPORT_MAX_BYTES`.
+    :return: The newly created import job.
+    :rtype: ImportJobResponse
+    :status 202: The import was accepted.
+    """
+    if format is None:
+        format = "vcard" if (file.filename or "").lower().endswith((".vcf", ".vcard")) else "csv"
+    path = await save_upload(file)
+    job = await import_service.create_job(user)
+    background_tasks.add_task(import_service.run, job, path, format, user, session_factory)
+    return job
+
+
+@router.get("/import/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(job_id: str, user: Principal = Depends(auth_service.get_current_principal)):
+    """
+    Retrieve the progress of an import job.
+
+    :param job_id: The ID returned when the import was started.
+    :type job_id: str
+    :param user: The current authenticated user, taken from the token claims when it carries them.
+    :type user: Principal
+    :raises HTTPException: If the job does not exist, has expired or belongs to another user, a 404 status code
+        is returned.
+    :return: The job status and counters.
+    :rtype: ImportJobResponse
+    """
+    job = await import_service.get_job(job_id, user)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
+    return job
 
 
 @router.get("/{contact_id}", response_model=ContactResponse)
-async def get_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
-                      user: User = Depends(auth_service.get_current_user)):
+async def get_contact(response: Response, contact_id: int = Path(ge=1), fields: str | None = FIELDS_QUERY,
+                      if_none_match: str | None = Header(None), db: AsyncSession = Depends(get_read_db),
+                      user: Principal = Depends(auth_service.get_current_user)):
     """
     Retrieve a specific contact by its ID.
 
     This endpoint retrieves a contact for the authenticated user based on the provided contact ID.
+    The response carries an `ETag`; sending it back in `If-None-Match` gets a 304 while the contact
+    is unchanged, and in `If-Match` on `PUT` guards against overwriting someone else's update.
 
+    :param response: The response, used to set the `ETag` header.
+    :type response: Response
     :param contact_id: The ID of the contact to retrieve (must be greater than or equal to 1).
     :type contact_id: int
+    :param fields: Comma-separated contact fields for a flat, sparse representation.
+    :type fields: str | None
+    :param if_none_match: ETags of versions the client already has.
+    :type if_none_match: str | None
     :param db: Database session dependency.
     :type db: AsyncSession
     :param user: The current authenticated user.
-    :type user: User
+    :type user: Principal
     :raises HTTPException: If the contact is not found, a 404 status code is returned.
     :return: The contact details.
     :rtype: ContactResponse
     """
-    contact = await repository_contents.get_contact(contact_id, db, user)
+    columns = parse_fields(fields)
+    # The owner is the current user, so the row alone makes up either representation: no join
+    contact = await repository_contents.get_contact(contact_id, db, user, repository_contents.CONTACT_VERSION_FIELDS)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
-    return contact
+    etag = contact_etag(contact, columns, user)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if columns is not None:
+        return sparse_response({field: contact[field] for field in columns}, {"ETag": etag})
+    response.headers["ETag"] = etag
+    return {**contact, "user": user}
 
 
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
 async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db),
-                         user: User = Depends(auth_service.get_current_user)):
+                         user: Principal = Depends(auth_service.get_current_user)):
     """
     Create a new contact.
 
@@ -73,7 +464,7 @@ async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db)
     :param db: Database session dependency.
     :type db: AsyncSession
     :param user: The current authenticated user.
-    :type user: User
+    :type user: Principal
     :return: The created contact details.
     :rtype: ContactResponse
     :status 201: The contact was created successfully.
@@ -82,35 +473,79 @@ async def create_contact(body: ContactSchema, db: AsyncSession = Depends(get_db)
     return contact
 
 
-@router.put("/{contact_id}")
-async def update_contact(body: ContactUpdateSchema, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
-                         user: User = Depends(auth_service.get_current_user)):
+@router.post("/bulk", response_model=ContactBulkResponse)
+async def create_contacts_bulk(body: list[ContactSchema] = Body(min_length=1, max_length=config.CONTACTS_BULK_MAX),
+                               db: AsyncSession = Depends(get_db),
+                               user: Principal = Depends(auth_service.get_current_user)):
+    """
+    Create many contacts at once.
+
+    Rows are inserted in chunks of ``CONTACTS_BULK_CHUNK_SIZE`` with one multi-row insert each. A row whose
+    email or phone number is already taken is skipped and reported in ``conflicts``; the rest are created.
+
+    :param body: The contacts to create.
+    :type body: list[ContactSchema]
+    :param db: Database session dependency.
+    :type db: AsyncSession
+    :param user: The current authenticated user.
+    :type user: Principal
+    :return: Positions and IDs of the created contacts, and the rows that conflicted.
+    :rtype: ContactBulkResponse
+    """
+    created, conflicts = await repository_contents.create_contacts(body, db, user, config.CONTACTS_BULK_CHUNK_SIZE)
+    return {
+        "created": [{"index": index, "id": contact_id} for index, contact_id in created],
+        "conflicts": [{"index": index, "email": body[index].email, "phone_number": body[index].phone_number}
+                      for index in conflicts],
+    }
+
+
+@router.put("/{contact_id}", response_model=ContactResponse)
+async def update_contact(body: ContactUpdateSchema, response: Response, contact_id: int = Path(ge=1),
+                         if_match: str | None = Header(None), db: AsyncSession = Depends(get_db),
+                         user: Principal = Depends(auth_service.get_current_user)):
     """
     Update an existing contact by its ID.
 
     This endpoint allows the authenticated user to update the details of a contact.
+    With `If-Match` set to the contact's `ETag`, the update only happens if the contact has not changed
+    since that version was read.
 
     :param body: The updated data for the contact.
     :type body: ContactUpdateSchema
+    :param response: The response, used to set the `ETag` header of the new version.
+    :type response: Response
     :param contact_id: The ID of the contact to update (must be greater than or equal to 1).
     :type contact_id: int
+    :param if_match: ETag of the version the update is based on.
+    :type if_match: str | None
     :param db: Database session dependency.
     :type db: AsyncSession
     :param user: The current authenticated user.
-    :type user: User
-    :raises HTTPException: If the contact is not found, a 404 status code is returned.
+    :type user: Principal
+    :raises HTTPException: If the contact is not found, a 404 status code is returned; if it changed since
+        the `If-Match` version, 412.
     :return: The updated contact details.
     :rtype: ContactResponse
     """
+    if if_match is not None:
+        # Locks the row until update_contact commits, so the version cannot change in between
+        current = await repository_contents.get_contact(contact_id, db, user,
+                                                        repository_contents.CONTACT_VERSION_FIELDS, for_update=True)
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
+        if not etag_matches(if_match, contact_etag(current, None, user), weak=False):
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Contact has changed")
     contact = await repository_contents.update_contact(contact_id, body, db, user)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
-    return contact
+    response.headers["ETag"] = contact_etag(contact, None, user)
+    return {**contact, "user": user}
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
-                         user: User = Depends(auth_service.get_current_user)):
+                         user: Principal = Depends(auth_service.get_current_user)):
     """
     Delete a contact by its ID.
 
@@ -121,7 +556,7 @@ async def delete_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depend
     :param db: Database session dependency.
     :type db: AsyncSession
     :param user: The current authenticated user.
-    :type user: User
+    :type user: Principal
     :return: No content on successful deletion.
     :rtype: None
     :status 204: The contact was deleted successfully.
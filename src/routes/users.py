@@ -14,7 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_limiter.depends import RateLimiter
 
 from src.database.db import get_db
-from src.entity.models import User
+from src.entity.principal import Principal
 from src.conf.config import config
 
 from src.schemas.user import UserResponse
@@ -35,7 +35,7 @@ cloudinary.config(
     response_model=UserResponse,
     dependencies=[Depends(RateLimiter(times=2, seconds=5))],
 )
-async def get_current_user(user: User = Depends(auth_service.get_current_user)):
+async def get_current_user(user: Principal = Depends(auth_service.get_current_principal)):
     return user
 
 
@@ -46,7 +46,7 @@ async def get_current_user(user: User = Depends(auth_service.get_current_user)):
 )
 async def get_current_user(
     file: UploadFile = File(),
-    user: User = Depends(auth_service.get_current_user),
+    user: Principal = Depends(auth_service.get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     public_idd = f"Web16/{user.email}"
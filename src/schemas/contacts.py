@@ -1,6 +1,6 @@
 
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 
 from src.schemas.user import UserResponse
@@ -27,3 +27,55 @@ class ContactResponse(BaseModel):
     user: UserResponse | None
     model_config = ConfigDict(from_atributes=True)
 
+
+
+class ContactBatchResponse(BaseModel):
+    contacts: list[ContactResponse]
+    not_found: list[int]
+
+
+class ContactBulkCreated(BaseModel):
+    index: int
+    id: int
+
+
+class ContactBulkConflict(BaseModel):
+    index: int
+    email: str
+    phone_number: str
+    detail: str = "Email or phone number already exists"
+
+
+class ContactBulkResponse(BaseModel):
+    created: list[ContactBulkCreated]
+    conflicts: list[ContactBulkConflict]
+
+
+class ImportJobError(BaseModel):
+    row: int
+    detail: str
+
+
+class ImportJobResponse(BaseModel):
+    id: str
+    status: str
+    processed: int
+    created: int
+    failed: int
+    errors: list[ImportJobError]
+
+
+class ContactChange(BaseModel):
+    id: int
+    full_name: str
+    email: str
+    phone_number: str
+    birthday: date
+    updated_at: datetime | None
+
+
+class ContactChangesResponse(BaseModel):
+    changed: list[ContactChange]
+    deleted: list[int]
+    cursor: str
+    has_more: bool
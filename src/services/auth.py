@@ -1,43 +1,66 @@
-import pickle
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 
-import redis
 from fastapi import Depends, HTTPException, status
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
-from src.database.db import get_db
+from src.database.db import get_read_session_factory
+from src.entity.principal import Principal
 from src.repository import users as repository_users
+from src.services.cache import LRUCache, user_cache
+from src.services.hashing import PasswordHasher
+from src.services.token_store import InMemoryRefreshTokenStore, RedisRefreshTokenStore
 
 from src.conf.config import config
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+
+
+async def get_read_db(token: str = Depends(oauth2_scheme), sessions=Depends(get_read_session_factory)):
+    """
+    Session for read-only routes, on a read replica when one is configured.
+
+    Requests of a user who wrote in the last few seconds read from the primary, so they see their writes.
+    """
+    try:
+        email = auth_service.decode_access_token(token).get("sub")
+    except JWTError:
+        email = None
+    async with sessions(email) as db:
+        yield db
+
 
 class Auth:
     pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hasher = PasswordHasher(pwd_context, config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_MAX_QUEUE)
     SECRET_KEY = config.SECRET_KEY_JWT
     ALGORITHM = config.ALGORITHM
-    cache = redis.Redis(
-        host=config.REDIS_DOMAIN,
-        port=config.REDIS_PORT,
-        db=0,
-        password=config.REDIS_PASSWORD,
-    )
+    EMBED_CLAIMS = config.AUTH_EMBED_CLAIMS
+    cache = user_cache
+    token_cache = LRUCache(config.TOKEN_CACHE_SIZE, ttl=15 * 60)
+    refresh_tokens = (InMemoryRefreshTokenStore() if config.REFRESH_TOKEN_STORE == "memory"
+                      else RedisRefreshTokenStore(user_cache.redis))
 
-    def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password):
+        return await self.hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str):
+        return await self.hasher.hash(password)
 
-    oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+    oauth2_scheme = oauth2_scheme
 
     async def create_access_token(
-        self, data: dict, expires_delta: Optional[float] = None
+        self, data: dict, expires_delta: Optional[float] = None, principal: Optional[Principal] = None
     ):
         to_encode = data.copy()
+        if principal is not None and self.EMBED_CLAIMS:
+            to_encode["usr"] = [principal.id, principal.username, principal.avatar, principal.verified]
         if expires_delta:
             expire = datetime.now() + timedelta(seconds=expires_delta)
         else:
@@ -54,27 +77,30 @@ class Auth:
     async def create_refresh_token(
         self, data: dict, expires_delta: Optional[float] = None
     ):
+        # Every login starts a new token family, tracked in the refresh token store
+        ttl = int(expires_delta or timedelta(days=7).total_seconds())
+        family, jti = uuid.uuid4().hex, uuid.uuid4().hex
+        await self.refresh_tokens.issue(data["sub"], family, jti, ttl)
+        return self._encode_refresh_token(data, ttl, family, jti)
+
+    def _encode_refresh_token(self, data: dict, ttl: int, family: str, jti: str):
         to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.now() + timedelta(seconds=expires_delta)
-        else:
-            expire = datetime.now() + timedelta(days=7)
+        expire = datetime.now() + timedelta(seconds=ttl)
         to_encode.update(
-            {"iat": datetime.now(), "exp": expire, "scope": "refresh_token"}
+            {"iat": datetime.now(), "exp": expire, "scope": "refresh_token", "fam": family, "jti": jti}
         )
         encoded_refresh_token = jwt.encode(
             to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM
         )
         return encoded_refresh_token
 
-    async def decode_refresh_token(self, refresh_token: str):
+    def _decode_refresh_payload(self, refresh_token: str) -> dict:
         try:
             payload = jwt.decode(
                 refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM]
             )
             if payload["scope"] == "refresh_token":
-                email = payload["sub"]
-                return email
+                return payload
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid scope for token",
@@ -85,9 +111,44 @@ class Auth:
                 detail="Could not validate credentials",
             )
 
+    async def decode_refresh_token(self, refresh_token: str):
+        return self._decode_refresh_payload(refresh_token)["sub"]
+
+    async def rotate_refresh_token(
+        self, refresh_token: str, expires_delta: Optional[float] = None
+    ) -> tuple[str, str]:
+        """
+        Exchange a refresh token for the next one of its family.
+
+        Returns the token's subject and the new refresh token. A token that is not the current one of its
+        family revokes the family, so a replayed token also locks out whoever rotated it first.
+        """
+        payload = self._decode_refresh_payload(refresh_token)
+        email, family = payload["sub"], payload.get("fam")
+        ttl = int(expires_delta or timedelta(days=7).total_seconds())
+        new_jti = uuid.uuid4().hex
+        if family is None or not await self.refresh_tokens.rotate(email, family, payload.get("jti"), new_jti, ttl):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token",
+            )
+        return email, self._encode_refresh_token({"sub": email}, ttl, family, new_jti)
+
+    def decode_access_token(self, token: str) -> dict:
+        # Verified claims are memoized by token digest until the token expires, so a client reusing
+        # its access token skips signature verification. Invalid tokens are never cached.
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self.token_cache.get(key)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            ttl = payload.get("exp", 0) - time.time()
+            if ttl > 0:
+                self.token_cache.set(key, payload, ttl=min(ttl, self.token_cache.ttl))
+        return payload
+
     async def get_current_user(
-        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-    ):
+        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)
+    ) -> Principal:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -96,7 +157,7 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_access_token(token)
             if payload["scope"] == "access_token":
                 email = payload["sub"]
                 if email is None:
@@ -106,22 +167,34 @@ class Auth:
         except JWTError as e:
             raise credentials_exception
 
-        user_hash = str(email)
-        user = self.cache.get(user_hash)
-
+        user = await self.get_principal(str(email), db)
         if user is None:
-            print("User from db")
-            user = await repository_users.get_user_by_email(email, db)
-            if user is None:
-                raise credentials_exception
-            print("starting cash")
-            self.cache.set(user_hash, pickle.dumps(user))
-            self.cache.expire(user_hash, 300)
-        else:
-            print("User from cache")
-            user = pickle.loads(user)
+            raise credentials_exception
         return user
 
+    async def get_principal(self, email: str, db: AsyncSession) -> Principal | None:
+        async def load():
+            user = await repository_users.get_user_by_email(email, db)
+            return None if user is None else Principal.from_user(user)
+
+        return await self.cache.get_or_load(email, load)
+
+    async def get_current_principal(
+        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)
+    ) -> Principal:
+        # Lighter alternative to get_current_user for read endpoints: when the access token carries the
+        # principal claims, the user is built from them without any I/O. Those claims are as old as the
+        # token; tokens without them fall back to the full lookup.
+        try:
+            payload = self.decode_access_token(token)
+        except JWTError:
+            payload = {}
+        claims = payload.get("usr")
+        if payload.get("scope") != "access_token" or not payload.get("sub") or claims is None:
+            return await self.get_current_user(token, db)
+        user_id, username, avatar, verified = claims
+        return Principal(id=user_id, email=payload["sub"], username=username, avatar=avatar, verified=verified)
+
     def create_email_token(self, data: dict):
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=7)
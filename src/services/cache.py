@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from src.conf.config import config
+from src.entity.principal import Principal
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Bounded in-process cache with least-recently-used eviction and a TTL.
+
+    Not thread-safe: it is meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        return None if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class UserCache:
+    """
+    Two-tier cache for authenticated users.
+
+    L1 is a small per-process LRU holding decoded :class:`Principal` objects, L2 is Redis shared by every
+    worker and holds their encoded form. A hit in L1 resolves the user without any network round trip or
+    decoding, an L2 hit is copied into L1.
+
+    :meth:`get_or_load` lets only one load per key run at a time in this worker, and refreshes a Redis
+    entry slightly before it expires with a probability that grows as expiry approaches (XFetch), so a
+    hot key does not expire for every worker at once.
+
+    Writes go through :meth:`invalidate`, which updates Redis and announces the key on a pub/sub channel;
+    every worker running :meth:`listen` then drops its L1 copy.
+    """
+
+    def __init__(self, client: redis.Redis, ttl: int, local: LRUCache, channel: str = "user-cache:invalidate",
+                 early_refresh_beta: float = 1.0):
+        self.redis = client
+        self.ttl = ttl
+        self.local = local
+        self.channel = channel
+        self.early_refresh_beta = early_refresh_beta
+        self.node_id = uuid.uuid4().hex
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._load_time = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.early_refreshes = 0
+        self.invalidations = 0
+
+    def _encode(self, principal: Principal) -> bytes:
+        # The absolute expiry travels with the value so early refresh needs no extra TTL round trip.
+        return b"%.3f|" % (time.time() + self.ttl) + principal.dumps()
+
+    @staticmethod
+    def _decode(data: bytes | None) -> tuple[Principal | None, float]:
+        if data is None:
+            return None, 0.0
+        expires_at, _, payload = data.partition(b"|")
+        try:
+            return Principal.loads(payload), float(expires_at)
+        except ValueError:
+            return None, 0.0
+
+    def _should_refresh_early(self, expires_at: float) -> bool:
+        gap = self._load_time * self.early_refresh_beta * -math.log(1.0 - random.random())
+        return time.time() + gap >= expires_at
+
+    async def get(self, key: str) -> Principal | None:
+        principal = self.local.get(key)
+        if principal is not None:
+            return principal
+        principal, _ = self._decode(await self.redis.get(key))
+        if principal is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.local.set(key, principal)
+        return principal
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Principal | None]]) -> Principal | None:
+        """Return the cached principal for ``key``, calling ``loader`` on a miss or an early refresh."""
+        principal = self.local.get(key)
+        if principal is not None:
+            return principal
+        principal, expires_at = self._decode(await self.redis.get(key))
+        if principal is None:
+            self.misses += 1
+        elif self._should_refresh_early(expires_at):
+            self.early_refreshes += 1
+        else:
+            self.hits += 1
+            self.local.set(key, principal)
+            return principal
+        return await self._load(key, loader)
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Principal | None]]) -> Principal | None:
+        while (future := self._inflight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only take over when the loading request was cancelled, not this one.
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            start = time.monotonic()
+            self.loads += 1
+            principal = await loader()
+            self._load_time += (time.monotonic() - start - self._load_time) * 0.2
+            if principal is not None:
+                await self.set(key, principal)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            future.exception()  # mark as retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(principal)
+            return principal
+        finally:
+            del self._inflight[key]
+
+    async def set(self, key: str, principal: Principal):
+        self.local.set(key, principal)
+        await self.redis.set(key, self._encode(principal), ex=self.ttl)
+
+    async def invalidate(self, key: str, principal: Principal | None = None):
+        """
+        Drop ``key`` from both tiers on every worker.
+
+        When the new ``principal`` is already known it is written through to Redis instead, so the next
+        request does not have to go to the database.
+        """
+        if principal is None:
+            self.local.pop(key)
+            await self.redis.delete(key)
+        else:
+            await self.set(key, principal)
+        await self.redis.publish(self.channel, f"{self.node_id} {key}")
+
+    def on_message(self, data: bytes):
+        node_id, _, key = data.decode().partition(" ")
+        if node_id != self.node_id:
+            self.local.pop(key)
+            self.invalidations += 1
+
+    async def listen(self, retry_delay: float = 1.0):
+        """Apply invalidations published by other workers until cancelled."""
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Messages published while we were not subscribed are lost, so start from a clean L1.
+                self.local.clear()
+                async for message in pubsub.listen():
+                    self.on_message(message["data"])
+            except (RedisError, OSError) as err:
+                logger.warning("User cache invalidations lost, resubscribing in %ss: %s", retry_delay, err)
+            finally:
+                await pubsub.reset()
+            await asyncio.sleep(retry_delay)
+
+    def stats(self) -> dict:
+        return {"l1": self.local.stats(),
+                "l2": {"hits": self.hits, "misses": self.misses, "early_refreshes": self.early_refreshes},
+                "loads": self.loads, "coalesced": self.coalesced, "invalidations": self.invalidations}
+
+
+redis_pool = redis.ConnectionPool(
+    host=config.REDIS_DOMAIN,
+    port=config.REDIS_PORT,
+    db=0,
+    password=config.REDIS_PASSWORD,
+    max_connections=config.REDIS_MAX_CONNECTIONS,
+)
+
+user_cache = UserCache(
+    redis.Redis(connection_pool=redis_pool),
+    ttl=config.USER_CACHE_TTL,
+    local=LRUCache(config.USER_CACHE_L1_SIZE, config.USER_CACHE_L1_TTL),
+    early_refresh_beta=config.USER_CACHE_EARLY_REFRESH_BETA,
+)
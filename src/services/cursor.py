@@ -0,0 +1,31 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(position: dict) -> str:
+    """
+    Pack a pagination position into an opaque, URL-safe token.
+
+    >>> encode_cursor({"id": 42})
+    'eyJpZCI6NDJ9'
+    """
+    data = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Inverse of :func:`encode_cursor`; a malformed token is the client's fault and answered with 400.
+
+    >>> decode_cursor("eyJpZCI6NDJ9")
+    {'id': 42}
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        position = None
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return position
@@ -0,0 +1,24 @@
+import hashlib
+import json
+
+
+def make_etag(*parts) -> str:
+    """Strong entity tag over JSON-serializable ``parts``, e.g. a row version plus the request parameters."""
+    digest = hashlib.sha256(json.dumps(parts, default=str, separators=(",", ":")).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(header: str | None, etag: str, weak: bool = True) -> bool:
+    """
+    Evaluate an ``If-None-Match`` (``weak=True``) or ``If-Match`` (``weak=False``) header against ``etag``.
+
+    ``If-Match`` uses the strong comparison of RFC 9110, so weak tags never match it.
+    """
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in header.split(",")]
+    if weak:
+        tags = [tag.removeprefix("W/") for tag in tags]
+    return etag in tags
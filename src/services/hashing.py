@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+
+class PasswordHasher:
+    """
+    Runs passlib hashing and verification on a bounded thread pool.
+
+    bcrypt releases the GIL while it works, so a handful of threads is enough to keep the event loop
+    responsive during a login burst. Calls beyond ``workers`` wait in the executor queue; once the queue
+    holds ``max_queue`` calls new ones are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.in_flight = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def _run(self, fn, *args):
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "in_flight": self.in_flight, "queue_depth": self.queue_depth,
+                "max_queue": self.max_queue, "rejected": self.rejected}
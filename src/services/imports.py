@@ -0,0 +1,200 @@
+import abc
+import asyncio
+import csv
+import dataclasses
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterable, Iterator, Literal, TextIO
+
+import redis.asyncio as redis
+from pydantic import ValidationError
+
+from src.conf.config import config
+from src.entity.principal import Principal
+from src.repository import contacts as repository_contacts
+from src.schemas.contacts import ContactSchema
+from src.services.cache import redis_pool
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "vcard"]
+
+VCARD_FIELDS = {"FN": "full_name", "EMAIL": "email", "TEL": "phone_number", "BDAY": "birthday"}
+
+
+@dataclass
+class ImportJob:
+    id: str
+    user_id: int
+    status: Literal["pending", "running", "done", "failed"] = "pending"
+    processed: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def fail(self, row: int, detail: str):
+        self.failed += 1
+        if len(self.errors) < config.CONTACTS_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "detail": detail})
+
+    def dumps(self) -> str:
+        return json.dumps(dataclasses.asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, raw: str | bytes) -> "ImportJob":
+        return cls(**json.loads(raw))
+
+
+class ImportJobStore(abc.ABC):
+    """Progress of import jobs, readable by whichever worker the client polls."""
+
+    @abc.abstractmethod
+    async def save(self, job: ImportJob) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def get(self, job_id: str) -> ImportJob | None:
+        ...
+
+
+class RedisImportJobStore(ImportJobStore):
+    def __init__(self, client: redis.Redis, ttl: int, prefix: str = "import"):
+        self.redis = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def save(self, job: ImportJob) -> None:
+        await self.redis.set(f"{self.prefix}:{job.id}", job.dumps(), ex=self.ttl)
+
+    async def get(self, job_id: str) -> ImportJob | None:
+        raw = await self.redis.get(f"{self.prefix}:{job_id}")
+        return None if raw is None else ImportJob.loads(raw)
+
+
+class InMemoryImportJobStore(ImportJobStore):
+    """Process-local store for tests and single-worker development setups."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._jobs: dict[str, tuple[str, float]] = {}
+
+    async def save(self, job: ImportJob) -> None:
+        self._jobs[job.id] = (job.dumps(), time.monotonic() + self.ttl)
+
+    async def get(self, job_id: str) -> ImportJob | None:
+        raw, expires_at = self._jobs.get(job_id, (None, 0.0))
+        return ImportJob.loads(raw) if raw is not None and expires_at > time.monotonic() else None
+
+
+def read_csv(file: TextIO) -> Iterator[dict]:
+    # Same columns as the CSV export; unknown ones, such as `id`, are ignored
+    yield from csv.DictReader(file)
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    # RFC 6350 folds long lines by starting the continuation with a space or a tab
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def read_vcard(file: TextIO) -> Iterator[dict]:
+    card = None
+    for line in _unfold(file):
+        name, _, value = line.partition(":")
+        # Drop parameters (`TEL;TYPE=cell`) and group prefixes (`item1.EMAIL`)
+        key = name.split(";", 1)[0].rsplit(".", 1)[-1].upper()
+        if key == "BEGIN" and value.strip().upper() == "VCARD":
+            card = {}
+        elif key == "END" and card is not None:
+            yield card
+            card = None
+        elif card is not None and key in VCARD_FIELDS and VCARD_FIELDS[key] not in card:
+            value = value.strip()
+            if key == "BDAY" and len(value) == 8 and value.isdigit():
+                value = f"{value[:4]}-{value[4:6]}-{value[6:]}"
+            card[VCARD_FIELDS[key]] = value
+
+
+READERS = {"csv": read_csv, "vcard": read_vcard}
+
+
+class ContactImporter:
+    """
+    Imports uploaded contact files in the background.
+
+    The file is read lazily, ``batch_size`` records at a time; each batch is validated against
+    ``ContactSchema`` and its valid rows inserted and committed through ``create_contacts`` before the next
+    batch is read. The job is saved after every batch so clients can poll its progress.
+    """
+
+    def __init__(self, jobs: ImportJobStore, batch_size: int):
+        self.jobs = jobs
+        self.batch_size = batch_size
+
+    async def create_job(self, user: Principal) -> ImportJob:
+        job = ImportJob(id=uuid.uuid4().hex, user_id=user.id)
+        await self.jobs.save(job)
+        return job
+
+    async def get_job(self, job_id: str, user: Principal) -> ImportJob | None:
+        job = await self.jobs.get(job_id)
+        return job if job is not None and job.user_id == user.id else None
+
+    async def _import_batch(self, job: ImportJob, batch: list[tuple[int, dict]], user: Principal, session_factory):
+        valid = []
+        for row, record in batch:
+            try:
+                valid.append((row, ContactSchema.model_validate(record)))
+            except ValidationError as err:
+                job.fail(row, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                                        for error in err.errors()))
+        if valid:
+            async with session_factory() as db:
+                created, conflicts = await repository_contacts.create_contacts(
+                    [body for _, body in valid], db, user, config.CONTACTS_BULK_CHUNK_SIZE)
+            job.created += len(created)
+            for index in conflicts:
+                job.fail(valid[index][0], "Email or phone number already exists")
+        job.processed += len(batch)
+
+    async def run(self, job: ImportJob, path: str, format: ImportFormat, user: Principal, session_factory):
+        job.status = "running"
+        await self.jobs.save(job)
+        try:
+            # Reading and parsing the file is blocking, so every batch is read in a thread
+            file = await asyncio.to_thread(open, path, newline="", encoding="utf-8-sig")
+            try:
+                records = enumerate(READERS[format](file), 1)
+                while batch := await asyncio.to_thread(list, islice(records, self.batch_size)):
+                    await self._import_batch(job, batch, user, session_factory)
+                    await self.jobs.save(job)
+            finally:
+                await asyncio.to_thread(file.close)
+            job.status = "done"
+        except Exception:
+            logger.exception("Import job %s failed", job.id)
+            job.status = "failed"
+        finally:
+            await asyncio.to_thread(os.unlink, path)
+            await self.jobs.save(job)
+
+
+import_service = ContactImporter(
+    InMemoryImportJobStore(config.CONTACTS_IMPORT_JOB_TTL) if config.IMPORT_JOB_STORE == "memory"
+    else RedisImportJobStore(redis.Redis(connection_pool=redis_pool), config.CONTACTS_IMPORT_JOB_TTL),
+    config.CONTACTS_IMPORT_BATCH_SIZE,
+)
@@ -0,0 +1,135 @@
+import abc
+import hashlib
+import json
+
+import redis.asyncio as redis
+
+from src.conf.config import config
+from src.services.cache import LRUCache, redis_pool
+
+
+class PageStore(abc.ABC):
+    """Storage of cached pages, each filed under the owner's version number at the time it was read."""
+
+    @abc.abstractmethod
+    async def get(self, user_id: int, key: str) -> tuple[int, bytes | None]:
+        """Return the user's current version and the page stored for ``key`` under it."""
+
+    @abc.abstractmethod
+    async def set(self, user_id: int, version: int, key: str, value: bytes, ttl: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def bump(self, user_id: int, ttl: int) -> None:
+        ...
+
+
+class RedisPageStore(PageStore):
+    # Reads the version and the page filed under it in one round trip
+    GET_SCRIPT = """
+    local version = redis.call('GET', KEYS[1]) or '0'
+    return {version, redis.call('GET', ARGV[1] .. version .. ':' .. ARGV[2])}
+    """
+
+    def __init__(self, client: redis.Redis, prefix: str = "contacts-page"):
+        self.redis = client
+        self.prefix = prefix
+        self._get = client.register_script(self.GET_SCRIPT)
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.prefix}:version:{user_id}"
+
+    async def get(self, user_id: int, key: str) -> tuple[int, bytes | None]:
+        version, value = await self._get(keys=[self._version_key(user_id)],
+                                         args=[f"{self.prefix}:{user_id}:", key])
+        return int(version), value
+
+    async def set(self, user_id: int, version: int, key: str, value: bytes, ttl: int) -> None:
+        # The version outlives every page filed under it; were it to expire first and restart from 0,
+        # pages of an old version 0 could be served again
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(f"{self.prefix}:{user_id}:{version}:{key}", value, ex=ttl)
+            pipe.expire(self._version_key(user_id), 2 * ttl)
+            await pipe.execute()
+
+    async def bump(self, user_id: int, ttl: int) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(self._version_key(user_id))
+            pipe.expire(self._version_key(user_id), 2 * ttl)
+            await pipe.execute()
+
+
+class InMemoryPageStore(PageStore):
+    """Process-local store for tests and single-worker development setups."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._versions: dict[int, int] = {}
+        self._pages = LRUCache(maxsize, ttl=0)
+
+    async def get(self, user_id: int, key: str) -> tuple[int, bytes | None]:
+        version = self._versions.get(user_id, 0)
+        return version, self._pages.get((user_id, version, key))
+
+    async def set(self, user_id: int, version: int, key: str, value: bytes, ttl: int) -> None:
+        self._pages.set((user_id, version, key), value, ttl)
+
+    async def bump(self, user_id: int, ttl: int) -> None:
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+
+class ContactPageCache:
+    """
+    Cache of serialized ``GET /contacts`` pages with O(1) invalidation.
+
+    Every user has a version number and pages are filed under the version current when they were read.
+    A write to any of the user's contacts bumps the version, after which the old pages are simply never
+    looked up again and expire on their own; nothing has to be scanned or deleted.
+
+    A page is cached together with its ``ETag`` and headers, so a hit, including a 304, is answered
+    without touching the database.
+    """
+
+    def __init__(self, store: PageStore, ttl: int):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bumps = 0
+
+    @staticmethod
+    def key(*params) -> str:
+        return hashlib.sha256(json.dumps(params, separators=(",", ":")).encode()).hexdigest()
+
+    async def get(self, user_id: int, key: str) -> tuple[int, tuple[str, dict, bytes] | None]:
+        """
+        Return the user's version and the cached ``(etag, headers, body)`` page, if any.
+
+        Read the version before the page is read from the database, so a write landing in between files
+        the result under an already outdated version rather than the other way round.
+        """
+        version, value = await self.store.get(user_id, key)
+        if value is None:
+            self.misses += 1
+            return version, None
+        self.hits += 1
+        meta, _, body = value.partition(b"\n")
+        etag, headers = json.loads(meta)
+        return version, (etag, headers, body)
+
+    async def set(self, user_id: int, version: int, key: str, etag: str, headers: dict, body: bytes):
+        value = json.dumps([etag, headers], separators=(",", ":")).encode() + b"\n" + body
+        await self.store.set(user_id, version, key, value, self.ttl)
+
+    async def bump(self, user_id: int):
+        self.bumps += 1
+        await self.store.bump(user_id, self.ttl)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bumps": self.bumps}
+
+
+contacts_page_cache = ContactPageCache(
+    InMemoryPageStore() if config.CONTACTS_PAGE_CACHE_STORE == "memory"
+    else RedisPageStore(redis.Redis(connection_pool=redis_pool)),
+    config.CONTACTS_PAGE_CACHE_TTL,
+)
@@ -0,0 +1,47 @@
+import abc
+
+import redis.asyncio as redis
+
+from src.conf.config import config
+from src.services.cache import LRUCache, redis_pool
+
+
+class RecentWritesStore(abc.ABC):
+    """Who wrote in the last few seconds, so their reads can be kept off lagging replicas on every worker."""
+
+    @abc.abstractmethod
+    async def mark(self, key: str, ttl: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def is_recent(self, key: str) -> bool:
+        ...
+
+
+class RedisRecentWritesStore(RecentWritesStore):
+    def __init__(self, client: redis.Redis, prefix: str = "ryw"):
+        self.redis = client
+        self.prefix = prefix
+
+    async def mark(self, key: str, ttl: float) -> None:
+        await self.redis.set(f"{self.prefix}:{key}", 1, px=max(1, int(ttl * 1000)))
+
+    async def is_recent(self, key: str) -> bool:
+        return bool(await self.redis.exists(f"{self.prefix}:{key}"))
+
+
+class InMemoryRecentWritesStore(RecentWritesStore):
+    """Process-local store for tests and single-worker development setups."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self._writes = LRUCache(maxsize, ttl=0)
+
+    async def mark(self, key: str, ttl: float) -> None:
+        self._writes.set(key, True, ttl)
+
+    async def is_recent(self, key: str) -> bool:
+        return self._writes.get(key) is not None
+
+
+recent_writes_store = (InMemoryRecentWritesStore() if config.RECENT_WRITES_STORE == "memory"
+                       else RedisRecentWritesStore(redis.Redis(connection_pool=redis_pool)))
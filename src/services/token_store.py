@@ -0,0 +1,77 @@
+import abc
+import time
+
+import redis.asyncio as redis
+
+
+class RefreshTokenStore(abc.ABC):
+    """
+    Server-side state of refresh tokens.
+
+    Every login starts a token family; each refresh rotates the family to a new token id (``jti``).
+    Presenting a token id that is no longer the current one of its family means the token was stolen
+    or replayed, so the whole family is revoked.
+    """
+
+    @abc.abstractmethod
+    async def issue(self, email: str, family: str, jti: str, ttl: int) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def rotate(self, email: str, family: str, jti: str, new_jti: str, ttl: int) -> bool:
+        """Replace ``jti`` with ``new_jti``; on a mismatch revoke the family and return ``False``."""
+
+    @abc.abstractmethod
+    async def revoke(self, email: str, family: str) -> None:
+        ...
+
+
+class RedisRefreshTokenStore(RefreshTokenStore):
+    ROTATE_SCRIPT = """
+    local current = redis.call('GET', KEYS[1])
+    if current == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        return 1
+    end
+    if current then
+        redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, client: redis.Redis, prefix: str = "refresh"):
+        self.redis = client
+        self.prefix = prefix
+        self._rotate = client.register_script(self.ROTATE_SCRIPT)
+
+    def _key(self, email: str, family: str) -> str:
+        return f"{self.prefix}:{email}:{family}"
+
+    async def issue(self, email: str, family: str, jti: str, ttl: int) -> None:
+        await self.redis.set(self._key(email, family), jti, ex=ttl)
+
+    async def rotate(self, email: str, family: str, jti: str, new_jti: str, ttl: int) -> bool:
+        return bool(await self._rotate(keys=[self._key(email, family)], args=[jti, new_jti, ttl]))
+
+    async def revoke(self, email: str, family: str) -> None:
+        await self.redis.delete(self._key(email, family))
+
+
+class InMemoryRefreshTokenStore(RefreshTokenStore):
+    """Process-local store for tests and single-worker development setups."""
+
+    def __init__(self):
+        self._families: dict[tuple[str, str], tuple[str, float]] = {}
+
+    async def issue(self, email: str, family: str, jti: str, ttl: int) -> None:
+        self._families[(email, family)] = (jti, time.monotonic() + ttl)
+
+    async def rotate(self, email: str, family: str, jti: str, new_jti: str, ttl: int) -> bool:
+        current = self._families.pop((email, family), None)
+        if current is None or current[0] != jti or current[1] <= time.monotonic():
+            return False
+        self._families[(email, family)] = (new_jti, time.monotonic() + ttl)
+        return True
+
+    async def revoke(self, email: str, family: str) -> None:
+        self._families.pop((email, family), None)
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+
+from src.repository import contacts as repository_contacts
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_tombstones_periodically(session_factory, retention: float, interval: float):
+    """
+    Delete contact tombstones older than ``retention`` seconds every ``interval`` seconds, until cancelled.
+
+    Every worker runs it; the deletes are idempotent, so overlapping runs only repeat work.
+    """
+    while True:
+        try:
+            async with session_factory() as db:
+                purged = await repository_contacts.purge_tombstones(retention, db)
+            if purged:
+                logger.info("Purged %d contact tombstones", purged)
+        except Exception:
+            logger.exception("Purging contact tombstones failed")
+        await asyncio.sleep(interval)
@@ -1,14 +1,21 @@
+import contextlib
+
 import pytest
 import asyncio
 import pytest_asyncio
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from main import app
 from src.entity.models import Base, User
-from src.database.db import get_db
+from src.database.db import get_db, get_read_session_factory, get_session_factory, sessionmanager
 from src.services.auth import auth_service
+from src.services.imports import InMemoryImportJobStore, import_service
+from src.services.page_cache import InMemoryPageStore, contacts_page_cache
+from src.services.recent_writes import InMemoryRecentWritesStore
+from src.services.token_store import InMemoryRefreshTokenStore
 
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
@@ -27,7 +34,7 @@ def init_models_wrap():
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
         async with TestingSessionLocal() as session:
-            hash_password = auth_service.get_password_hash(test_user["password"])
+            hash_password = await auth_service.get_password_hash(test_user["password"])
             current_user = User(username=test_user["username"], email=test_user["email"], password=hash_password,
                                 avatar=test_user["avatar"], verified=True)
             session.add(current_user)
@@ -36,6 +43,37 @@ def init_models_wrap():
     asyncio.run(init_models())
 
 
+@pytest.fixture(scope="session", autouse=True)
+def refresh_token_store():
+    auth_service.refresh_tokens = InMemoryRefreshTokenStore()
+    yield auth_service.refresh_tokens
+
+
+@pytest.fixture(scope="session", autouse=True)
+def import_job_store():
+    import_service.jobs = InMemoryImportJobStore(ttl=60)
+    yield import_service.jobs
+
+
+@pytest.fixture(scope="session", autouse=True)
+def contacts_page_store():
+    contacts_page_cache.store = InMemoryPageStore()
+    yield contacts_page_cache.store
+
+
+@pytest.fixture(scope="session", autouse=True)
+def recent_writes_store():
+    sessionmanager.recent_writes = InMemoryRecentWritesStore()
+    yield sessionmanager.recent_writes
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    auth_service.cache.local.clear()
+    yield
+    auth_service.cache.local.clear()
+
+
 @pytest.fixture(scope="module")
 def client():
     # Dependency override
@@ -52,10 +90,32 @@ def client():
             await session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_read_session_factory] = lambda: lambda key=None: TestingSessionLocal()
 
     yield TestClient(app)
 
 
+@pytest.fixture()
+def count_statements():
+    """Context manager collecting the SQL statements executed inside it, to pin the round trips of an endpoint."""
+
+    @contextlib.contextmanager
+    def capture():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    return capture
+
+
 @pytest_asyncio.fixture()
 async def get_token():
     token = await auth_service.create_access_token(data={"sub": test_user["email"]})
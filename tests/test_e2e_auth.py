@@ -1,7 +1,8 @@
-from unittest.mock import Mock
+from unittest.mock import Mock, patch, AsyncMock
 import pytest
 
 from src.entity.models import User
+from src.services.auth import auth_service
 from tests.conftest import TestingSessionLocal
 from sqlalchemy import select
 
@@ -37,6 +38,21 @@ def test_not_verified_login(client):
     assert data["detail"] == "User not verified"
 
 
+def test_confirmed_email(client, count_statements):
+    token = auth_service.create_email_token({"sub": user_data.get("email")})
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock):
+        with count_statements() as statements:
+            response = client.get(f"api/auth/confirmed_email/{token}")
+        assert response.status_code == 200, response.text
+        assert response.json()["message"] == "Email confirmed"
+        # The lookup, then a single UPDATE ... RETURNING
+        assert len(statements) == 2, statements
+        assert statements[1].startswith("UPDATE users")
+
+        response = client.get(f"api/auth/confirmed_email/{token}")
+        assert response.json()["message"] == "Your email is already confirmed"
+
+
 @pytest.mark.asyncio
 async def test_login(client):
     async with TestingSessionLocal() as session:
@@ -54,6 +70,26 @@ async def test_login(client):
     assert "token_type" in data
 
 
+def test_refresh_token(client):
+    response = client.post("api/auth/login",
+                           data={"username": user_data.get("email"), "password": user_data.get("password")})
+    old_refresh_token = response.json()["refresh_token"]
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {old_refresh_token}"})
+        assert response.status_code == 200, response.text
+        new_refresh_token = response.json()["refresh_token"]
+        assert new_refresh_token != old_refresh_token
+        assert "access_token" in response.json()
+
+        response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {old_refresh_token}"})
+        assert response.status_code == 401, response.text
+        assert response.json()["detail"] == "Invalid refresh token"
+
+        response = client.get("api/auth/refresh_token", headers={"Authorization": f"Bearer {new_refresh_token}"})
+        assert response.status_code == 401, response.text
+
+
 def test_wrong_pwd_login(client):
     response = client.post("api/auth/login",
                            data={"username": user_data.get("email"), "password": "wrong_password"})
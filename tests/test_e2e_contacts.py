@@ -1,15 +1,29 @@
-from unittest.mock import Mock, patch
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from datetime import date, timedelta
+from unittest.mock import Mock, patch, AsyncMock
 
 import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 
+from main import app
+from src.database.db import DatabaseSessionManager, get_read_session_factory, get_session_factory, sessionmanager
 from src.services.auth import auth_service
+from src.conf.config import config
+from src.services.cursor import decode_cursor, encode_cursor
 
 test_contact = {"full_name": "TestTest", "email": "TestTest@gmail.com",
                 "phone_number": "1236547890", "birthday": "2024-08-17"}
 
 
 def test_get_contacts(client, get_token):
-    with patch.object(auth_service, 'cache') as redis_mock:
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
         redis_mock.get.return_value = None
         token = get_token
         headers = {"Authorization": f"Bearer {token}"}
@@ -20,7 +34,7 @@ def test_get_contacts(client, get_token):
 
 
 def test_create_contact(client, get_token):
-    with patch.object(auth_service, 'cache') as redis_mock:
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
         redis_mock.get.return_value = None
         token = get_token
         headers = {"Authorization": f"Bearer {token}"}
@@ -33,4 +47,479 @@ def test_create_contact(client, get_token):
         assert "id" in data
 
 
+def test_get_contacts_with_cursor(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        for i in range(14):
+            contact = {"full_name": f"Cursor{i}", "email": f"cursor{i}@gmail.com",
+                       "phone_number": f"555000{i:04}", "birthday": "2024-08-17"}
+            response = client.post("api/contacts", headers=headers, json=contact)
+            assert response.status_code == 201, response.text
+
+        response = client.get("api/contacts", headers=headers, params={"cursor": "", "limit": 10})
+        assert response.status_code == 200, response.text
+        first_page = response.json()
+        assert len(first_page) == 10
+        assert [c["id"] for c in first_page] == sorted(c["id"] for c in first_page)
+        next_cursor = response.headers["X-Next-Cursor"]
+
+        response = client.get("api/contacts", headers=headers, params={"cursor": next_cursor, "limit": 10})
+        assert response.status_code == 200, response.text
+        second_page = response.json()
+        assert len(second_page) == 5
+        assert second_page[0]["id"] > first_page[-1]["id"]
+        assert "X-Next-Cursor" not in response.headers
+
+        response = client.get("api/contacts", headers=headers, params={"cursor": "garbage", "limit": 10})
+        assert response.status_code == 400, response.text
+
+
+def test_get_contacts_sparse_fields(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        response = client.get("api/contacts", headers=headers, params={"fields": "full_name,birthday"})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert len(data) > 0
+        assert all(set(contact) == {"id", "full_name", "birthday"} for contact in data)
+
+        response = client.get(f"api/contacts/{data[0]['id']}", headers=headers, params={"fields": "email"})
+        assert response.status_code == 200, response.text
+        assert set(response.json()) == {"id", "email"}
+
+        response = client.get("api/contacts", headers=headers, params={"fields": "user"})
+        assert response.status_code == 400, response.text
+        assert response.json()["detail"] == "Unknown fields: user"
+
+
+def test_create_contacts_bulk(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contacts = [{"full_name": f"Bulk{i}", "email": f"bulk{i}@gmail.com",
+                     "phone_number": f"444000{i:04}", "birthday": "2024-08-17"} for i in range(3)]
+        contacts.append(test_contact)
+        contacts.append({**contacts[0], "phone_number": "4449999999"})
+        response = client.post("api/contacts/bulk", headers=headers, json=contacts)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert [row["index"] for row in data["created"]] == [0, 1, 2]
+        assert [row["index"] for row in data["conflicts"]] == [3, 4]
+        assert data["conflicts"][0]["email"] == test_contact["email"]
+
+        response = client.get(f"api/contacts/{data['created'][1]['id']}", headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.json()["email"] == "bulk1@gmail.com"
+
+        response = client.post("api/contacts/bulk", headers=headers, json=[])
+        assert response.status_code == 422, response.text
+
+
+def test_export_contacts(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        total = len(client.get("api/contacts", headers=headers, params={"limit": 500}).json())
+
+        response = client.get("api/contacts/export", headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == total
+        assert set(rows[0]) == {"id", "full_name", "email", "phone_number", "birthday"}
+
+        response = client.get("api/contacts/export", headers=headers, params={"format": "csv"})
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == total
+        assert rows[0]["email"] == test_contact["email"]
+
+
+def test_import_contacts(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        content = ("full_name,email,phone_number,birthday\r\n"
+                   "Imported0,imported0@gmail.com,3330000000,1990-01-31\r\n"
+                   "Imported1,not-an-email,3330000001,1990-01-31\r\n"
+                   f"Imported2,{test_contact['email']},3330000002,1990-01-31\r\n"
+                   "Imported3,imported3@gmail.com,3330000003,1990-01-31\r\n")
+        response = client.post("api/contacts/import", headers=headers,
+                               files={"file": ("contacts.csv", content, "text/csv")})
+        assert response.status_code == 202, response.text
+        job_id = response.json()["id"]
+
+        response = client.get(f"api/contacts/import/{job_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        job = response.json()
+        assert job["status"] == "done"
+        assert (job["processed"], job["created"], job["failed"]) == (4, 2, 2)
+        assert [error["row"] for error in job["errors"]] == [2, 3]
+
+        vcard = ("BEGIN:VCARD\r\nVERSION:3.0\r\nFN:Imported Card\r\nEMAIL;TYPE=work:importedcard@gmail.com\r\n"
+                 "TEL;TYPE=cell:3330000099\r\nBDAY:19900131\r\nEND:VCARD\r\n")
+        response = client.post("api/contacts/import", headers=headers,
+                               files={"file": ("contacts.vcf", vcard, "text/vcard")})
+        assert response.status_code == 202, response.text
+        job = client.get(f"api/contacts/import/{response.json()['id']}", headers=headers).json()
+        assert (job["status"], job["created"], job["failed"]) == ("done", 1, 0)
+
+        response = client.get("api/contacts/import/unknown", headers=headers)
+        assert response.status_code == 404, response.text
+
+        with patch("src.routes.contacts.config.CONTACTS_IMPORT_MAX_BYTES", 10), \
+                patch("src.routes.contacts.os.unlink", wraps=os.unlink) as unlink:
+            response = client.post("api/contacts/import", headers=headers,
+                                   files={"file": ("contacts.csv", content, "text/csv")})
+        assert response.status_code == 413, response.text
+        assert not os.path.exists(unlink.call_args.args[0])
+
+
+def test_get_upcoming_birthdays(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        today = date.today()
+        contact = {"full_name": "Birthday", "email": "birthday@gmail.com", "phone_number": "2220000000",
+                   "birthday": (today + timedelta(days=2)).replace(year=1992).isoformat()}
+        response = client.post("api/contacts", headers=headers, json=contact)
+        assert response.status_code == 201, response.text
+
+        response = client.get("api/contacts/birthdays", headers=headers, params={"days": 3})
+        assert response.status_code == 200, response.text
+        assert "birthday@gmail.com" in [c["email"] for c in response.json()]
+
+        response = client.get("api/contacts/birthdays", headers=headers, params={"days": 1})
+        assert response.status_code == 200, response.text
+        assert "birthday@gmail.com" not in [c["email"] for c in response.json()]
+
+
+def test_search_contacts(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        for i, name in enumerate(("Mary Search", "Search Anna", "Bob 100%")):
+            contact = {"full_name": name, "email": f"typeahead{i}@gmail.com", "phone_number": f"111222{i:04}",
+                       "birthday": "2024-08-17"}
+            response = client.post("api/contacts", headers=headers, json=contact)
+            assert response.status_code == 201, response.text
+
+        response = client.get("api/contacts", headers=headers, params={"q": "sEaRcH"})
+        assert response.status_code == 200, response.text
+        assert [c["full_name"] for c in response.json()] == ["Search Anna", "Mary Search"]
+
+        response = client.get("api/contacts", headers=headers, params={"q": "1112220001", "fields": "full_name"})
+        assert response.status_code == 200, response.text
+        assert response.json() == [{"id": response.json()[0]["id"], "full_name": "Search Anna"}]
+
+        response = client.get("api/contacts", headers=headers, params={"q": "0%"})
+        assert [c["full_name"] for c in response.json()] == ["Bob 100%"]
+
+        response = client.get("api/contacts", headers=headers, params={"q": "search", "cursor": ""})
+        assert response.status_code == 400, response.text
+
+
+def test_update_and_delete_contact_statements(client, get_token, count_statements):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contact = {"full_name": "Writes", "email": "writes@gmail.com", "phone_number": "6660000000",
+                   "birthday": "2024-08-17"}
+        response = client.post("api/contacts", headers=headers, json=contact)
+        assert response.status_code == 201, response.text
+        contact_id = response.json()["id"]
+
+        # The current user is cached by the request above, so only the write itself reaches the database
+        with count_statements() as statements:
+            response = client.put(f"api/contacts/{contact_id}", headers=headers,
+                                  json={**contact, "phone_number": "6660000001", "birthday": "2000-01-02"})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert (data["phone_number"], data["birthday"]) == ("6660000001", "2000-01-02")
+        assert data["user"]["email"] == "deadpool@example.com"
+        assert "password" not in data["user"]
+        assert len(statements) == 1 and statements[0].startswith("UPDATE contacts"), statements
+
+        with count_statements() as statements:
+            response = client.delete(f"api/contacts/{contact_id}", headers=headers)
+        assert response.status_code == 204, response.text
+        assert len(statements) == 2, statements
+        assert statements[0].startswith("DELETE FROM contacts")
+        assert statements[1].startswith("INSERT INTO contact_tombstones")
+
+        with count_statements() as statements:
+            response = client.put(f"api/contacts/{contact_id}", headers=headers, json=contact)
+        assert response.status_code == 404, response.text
+        assert len(statements) == 1, statements
 
+
+def test_conditional_requests(client, get_token, count_statements):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contact = {"full_name": "Conditional", "email": "conditional@gmail.com", "phone_number": "5550001234",
+                   "birthday": "2024-08-17"}
+        contact_id = client.post("api/contacts", headers=headers, json=contact).json()["id"]
+
+        response = client.get("api/contacts", headers=headers)
+        assert response.status_code == 200, response.text
+        list_etag = response.headers["ETag"]
+        with count_statements() as statements:
+            response = client.get("api/contacts", headers={**headers, "If-None-Match": list_etag})
+        assert response.status_code == 304, response.text
+        assert response.headers["ETag"] == list_etag
+        assert statements == []
+
+        response = client.get(f"api/contacts/{contact_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        etag = response.headers["ETag"]
+        assert response.json()["user"]["email"] == "deadpool@example.com"
+        response = client.get(f"api/contacts/{contact_id}", headers={**headers, "If-None-Match": f"W/{etag}"})
+        assert response.status_code == 304, response.text
+        response = client.get(f"api/contacts/{contact_id}", headers={**headers, "If-None-Match": etag},
+                              params={"fields": "email"})
+        assert response.status_code == 200, response.text
+        assert response.headers["ETag"] != etag
+
+        response = client.put(f"api/contacts/{contact_id}", headers={**headers, "If-Match": etag},
+                              json={**contact, "phone_number": "5550004321"})
+        assert response.status_code == 200, response.text
+        new_etag = response.headers["ETag"]
+        assert new_etag != etag
+        response = client.put(f"api/contacts/{contact_id}", headers={**headers, "If-Match": etag}, json=contact)
+        assert response.status_code == 412, response.text
+        response = client.get(f"api/contacts/{contact_id}", headers={**headers, "If-None-Match": new_etag})
+        assert response.status_code == 304, response.text
+
+        client.post("api/contacts", headers=headers, json={**contact, "email": "conditional2@gmail.com",
+                                                           "phone_number": "5550009999"})
+        response = client.get("api/contacts", headers={**headers, "If-None-Match": list_etag})
+        assert response.status_code == 200, response.text
+        assert response.headers["ETag"] != list_etag
+
+
+def test_contact_pages_are_cached_until_a_write(client, get_token, count_statements):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        params = {"limit": 500, "fields": "full_name"}
+        first = client.get("api/contacts", headers=headers, params=params)
+        assert first.status_code == 200, first.text
+
+        with count_statements() as statements:
+            response = client.get("api/contacts", headers=headers, params=params)
+        assert statements == []
+        assert response.content == first.content
+        assert response.headers["ETag"] == first.headers["ETag"]
+
+        contact = {"full_name": "Cached", "email": "cached@gmail.com", "phone_number": "4440001234",
+                   "birthday": "2024-08-17"}
+        contact_id = client.post("api/contacts", headers=headers, json=contact).json()["id"]
+        response = client.get("api/contacts", headers=headers, params=params)
+        assert {"id": contact_id, "full_name": "Cached"} in response.json()
+
+        client.delete(f"api/contacts/{contact_id}", headers=headers)
+        with count_statements() as statements:
+            response = client.get("api/contacts", headers=headers, params=params)
+        assert statements != []
+        assert response.content == first.content
+
+
+async def snapshot_replica(path) -> str:
+    # A copy of the primary as of now, lagging behind every later write on it
+    primary = app.dependency_overrides[get_session_factory]().kw["bind"]
+    async with primary.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM INTO :path"), {"path": str(path)})
+    return f"sqlite+aiosqlite:///{path}"
+
+
+def test_replica_pages_read_after_a_write_are_not_cached(client, get_token, tmp_path):
+    replica = create_async_engine(asyncio.run(snapshot_replica(tmp_path / "replica.db")), poolclass=NullPool)
+    ReplicaSession = async_sessionmaker(replica, expire_on_commit=False)
+
+    def replica_sessions(key=None):
+        session = ReplicaSession()
+        session.info["replica"] = True
+        return session
+
+    # Writes are only recorded as recent with replicas configured
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock, \
+            patch.object(sessionmanager, "_replica_engines", [replica]):
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        params = {"limit": 500}
+        contact = {"full_name": "Lagging", "email": "lagging@gmail.com", "phone_number": "4440009876",
+                   "birthday": "2024-08-17"}
+        contact_id = client.post("api/contacts", headers=headers, json=contact).json()["id"]
+
+        # The read was routed to the replica before the write was recorded
+        primary_sessions = app.dependency_overrides[get_read_session_factory]
+        app.dependency_overrides[get_read_session_factory] = lambda: replica_sessions
+        try:
+            response = client.get("api/contacts", headers=headers, params=params)
+        finally:
+            app.dependency_overrides[get_read_session_factory] = primary_sessions
+        assert response.status_code == 200, response.text
+        assert contact_id not in [c["id"] for c in response.json()]
+        assert "ETag" not in response.headers
+
+        response = client.get("api/contacts", headers=headers, params=params)
+        assert contact_id in [c["id"] for c in response.json()]
+        assert "ETag" in response.headers
+
+
+def test_sync_changes_from_a_replica(client, get_token, tmp_path):
+    replica_url = asyncio.run(snapshot_replica(tmp_path / "replica.db"))
+    primary_url = app.dependency_overrides[get_session_factory]().kw["bind"].url
+    manager = DatabaseSessionManager(primary_url.render_as_string(hide_password=False), replica_urls=[replica_url])
+    primary_sessions = app.dependency_overrides[get_read_session_factory]
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock, \
+            patch.object(config, "CONTACTS_SYNC_SAFETY_MARGIN", 0):
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        # With the user cached, the first use of the read session is the repository's dialect check
+        client.get("api/contacts/", headers=headers, params={"limit": 1})
+        app.dependency_overrides[get_read_session_factory] = lambda: manager.read_session
+        try:
+            response = client.get("api/contacts/changes", headers=headers, params={"limit": 7})
+        finally:
+            app.dependency_overrides[get_read_session_factory] = primary_sessions
+            asyncio.run(manager.close())
+    assert response.status_code == 200, response.text
+    assert len(response.json()["changed"]) == 7
+    assert manager.replica_reads == 1
+
+
+def test_sync_changes(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock, \
+            patch.object(config, "CONTACTS_SYNC_SAFETY_MARGIN", 0):
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        total = len(client.get("api/contacts", headers=headers, params={"limit": 500}).json())
+
+        synced, cursor, has_more = [], None, True
+        while has_more:
+            response = client.get("api/contacts/changes", headers=headers, params={"cursor": cursor, "limit": 7})
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert data["deleted"] == []
+            synced += [c["id"] for c in data["changed"]]
+            cursor, has_more = data["cursor"], data["has_more"]
+        assert len(synced) == len(set(synced)) == total
+
+        response = client.get("api/contacts/changes", headers=headers, params={"cursor": cursor})
+        assert response.json()["changed"] == [] and response.json()["deleted"] == []
+
+        contacts = [{"full_name": f"Sync{i}", "email": f"sync{i}@gmail.com", "phone_number": f"777000{i:04}",
+                     "birthday": "2024-08-17"} for i in range(3)]
+        ids = [client.post("api/contacts", headers=headers, json=contact).json()["id"] for contact in contacts]
+        client.put(f"api/contacts/{ids[0]}", headers=headers, json={**contacts[0], "phone_number": "7770009999"})
+        client.delete(f"api/contacts/{ids[1]}", headers=headers)
+
+        response = client.get("api/contacts/changes", headers=headers, params={"cursor": cursor})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert sorted(c["id"] for c in data["changed"]) == [ids[0], ids[2]]
+        assert data["deleted"] == [ids[1]]
+        assert not data["has_more"]
+
+        response = client.get("api/contacts/changes", headers=headers, params={"cursor": data["cursor"]})
+        assert response.json()["changed"] == [] and response.json()["deleted"] == []
+
+        response = client.get("api/contacts/changes", headers=headers, params={"cursor": encode_cursor({"d": "x"})})
+        assert response.status_code == 400, response.text
+
+        issued_at = int(time.time()) - config.CONTACTS_TOMBSTONE_RETENTION
+        old = encode_cursor({**decode_cursor(data["cursor"]), "t": issued_at})
+        response = client.get("api/contacts/changes", headers=headers, params={"cursor": old})
+        assert response.status_code == 410, response.text
+        response = client.get("api/contacts/changes", headers=headers, params={"cursor": encode_cursor({"d": 0})})
+        assert response.status_code == 410, response.text
+
+
+def test_sync_holds_back_unsettled_changes(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        with patch.object(config, "CONTACTS_SYNC_SAFETY_MARGIN", 0):
+            cursor, has_more = None, True
+            while has_more:
+                data = client.get("api/contacts/changes", headers=headers, params={"cursor": cursor}).json()
+                cursor, has_more = data["cursor"], data["has_more"]
+
+        kept, deleted = (client.post("api/contacts", headers=headers,
+                                     json={**test_contact, "email": f"unsettled{i}@gmail.com",
+                                           "phone_number": f"777111000{i}"}).json() for i in range(2))
+        client.delete(f"api/contacts/{deleted['id']}", headers=headers)
+        # Within the margin a write that started earlier could still commit behind these changes
+        data = client.get("api/contacts/changes", headers=headers, params={"cursor": cursor}).json()
+        assert (data["changed"], data["deleted"]) == ([], [])
+        with patch.object(config, "CONTACTS_SYNC_SAFETY_MARGIN", 0):
+            data = client.get("api/contacts/changes", headers=headers, params={"cursor": data["cursor"]}).json()
+        assert [c["id"] for c in data["changed"]] == [kept["id"]]
+        assert data["deleted"] == [deleted["id"]]
+
+
+def test_get_contacts_batch(client, get_token, count_statements):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contacts = client.get("api/contacts", headers=headers, params={"limit": 10}).json()
+        ids = [contacts[2]["id"], 999999, contacts[0]["id"], contacts[2]["id"]]
+
+        with count_statements() as statements:
+            response = client.get("api/contacts/batch", headers=headers, params={"ids": ",".join(map(str, ids))})
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert [c["id"] for c in data["contacts"]] == [contacts[2]["id"], contacts[0]["id"]]
+        assert data["contacts"][0]["user"]["email"] == "deadpool@example.com"
+        assert data["not_found"] == [999999]
+        assert len(statements) == 1, statements
+
+        response = client.get("api/contacts/batch", headers=headers,
+                               params={"ids": str(contacts[1]["id"]), "fields": "email"})
+        assert response.json() == {"contacts": [{"id": contacts[1]["id"], "email": contacts[1]["email"]}],
+                                   "not_found": []}
+
+        response = client.get("api/contacts/batch", headers=headers, params={"ids": "1,x"})
+        assert response.status_code == 400, response.text
+        response = client.get("api/contacts/batch", headers=headers,
+                              params={"ids": ",".join(map(str, range(1, 502)))})
+        assert response.status_code == 400, response.text
+
+
+def test_server_timing_reports_request_statements(client, get_token, count_statements):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        contact = client.post("api/contacts", headers=headers, json={**test_contact, "email": "timing@example.com",
+                                                                     "phone_number": "5550001111"}).json()
+
+        with count_statements() as statements:
+            response = client.get(f"api/contacts/{contact['id']}", headers=headers)
+        assert response.status_code == 200, response.text
+        db, slowest = response.headers["Server-Timing"].split(", ")
+        assert db.startswith("db;dur=") and db.endswith(f';desc="{len(statements)} statements"'), db
+        assert slowest.startswith("db-slowest;dur="), slowest
+
+
+def test_requests_without_checkout_are_counted(client, get_token):
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
+        redis_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {get_token}"}
+        client.get("api/contacts/", headers=headers)
+        before = client.get("api/metrics").json()["sql"]
+        # The user and the page are cached: no connection at all
+        client.get("api/contacts/", headers=headers)
+        # The user is cached, but the write checks out a connection: the request counts once, as one with a checkout
+        response = client.post("api/contacts/", headers=headers, json={**test_contact, "email": "checkout@example.com",
+                                                                       "phone_number": "5550002222"})
+        assert response.status_code == 201, response.text
+        after = client.get("api/metrics").json()["sql"]
+    # The first metrics request is counted once its response starts, after it read the metrics
+    assert after["requests"] - before["requests"] == 3
+    assert after["requests_without_checkout"] - before["requests_without_checkout"] == 2
@@ -9,7 +9,7 @@ test_contact = {"full_name": "TestTest", "email": "TestTest@gmail.com",
 
 
 def test_get_me(client, get_token, monkeypatch):
-    with patch.object(auth_service, 'cache') as redis_mock:
+    with patch.object(auth_service.cache, 'redis', new_callable=AsyncMock) as redis_mock:
         redis_mock.get.return_value = None
         monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
         monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from jose import jwt
+
+from src.entity.models import User
+from src.entity.principal import Principal
+from src.services.auth import Auth
+
+
+class TestDecodeAccessToken(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.auth = Auth()
+        self.auth.token_cache.clear()
+
+    async def test_repeat_decode_skips_verification(self):
+        token = await self.auth.create_access_token(data={"sub": "test@example.com"})
+        with patch("src.services.auth.jwt.decode", wraps=jwt.decode) as decode:
+            first = self.auth.decode_access_token(token)
+            second = self.auth.decode_access_token(token)
+        decode.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(first["sub"], "test@example.com")
+
+    async def test_entry_does_not_outlive_token(self):
+        token = await self.auth.create_access_token(data={"sub": "test@example.com"})
+        payload = self.auth.decode_access_token(token)
+        key = hashlib.sha256(token.encode()).digest()
+        expired_at = time.monotonic() + payload["exp"] - time.time() + 1
+        with patch("src.services.cache.time.monotonic", return_value=expired_at):
+            self.assertIsNone(self.auth.token_cache.get(key))
+
+    def test_invalid_token_is_not_cached(self):
+        with self.assertRaises(jwt.JWTError):
+            self.auth.decode_access_token("not-a-token")
+        self.assertEqual(len(self.auth.token_cache), 0)
+
+
+class TestCurrentPrincipal(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.auth = Auth()
+        self.principal = Principal(1, "test@example.com", "test", "avatar", True)
+
+    async def test_built_from_claims_without_lookup(self):
+        with patch.object(self.auth, "EMBED_CLAIMS", True):
+            token = await self.auth.create_access_token(data={"sub": self.principal.email}, principal=self.principal)
+        with patch.object(self.auth, "get_current_user", new_callable=AsyncMock) as get_current_user:
+            result = await self.auth.get_current_principal(token, db=None)
+        get_current_user.assert_not_awaited()
+        self.assertEqual(result, self.principal)
+
+    async def test_falls_back_to_full_lookup(self):
+        token = await self.auth.create_access_token(data={"sub": self.principal.email}, principal=self.principal)
+        with patch.object(self.auth, "get_current_user", new_callable=AsyncMock) as get_current_user:
+            get_current_user.return_value = self.principal
+            result = await self.auth.get_current_principal(token, db=None)
+        get_current_user.assert_awaited_once_with(token, None)
+        self.assertEqual(result, self.principal)
+
+
+class TestGetPrincipal(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.auth = Auth()
+        self.auth.cache.local.clear()
+
+    def tearDown(self) -> None:
+        self.auth.cache.local.clear()
+
+    async def test_simultaneous_misses_run_one_query(self):
+        queries = []
+
+        async def get_user_by_email(email, db):
+            queries.append(email)
+            await asyncio.sleep(0.05)
+            return User(id=1, username="test", email=email, avatar="avatar", verified=True)
+
+        with patch.object(self.auth.cache, "redis", new_callable=AsyncMock) as redis_mock, \
+                patch("src.services.auth.repository_users.get_user_by_email", get_user_by_email):
+            redis_mock.get.return_value = None
+            results = await asyncio.gather(*(self.auth.get_principal("test@example.com", None) for _ in range(50)))
+        self.assertEqual(queries, ["test@example.com"])
+        self.assertEqual(set(results), {Principal(1, "test@example.com", "test", "avatar", True)})
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import date
+
+from sqlalchemy import insert, select, text
+
+from src.entity.models import Contacts, User, month_day
+from src.entity.principal import Principal
+from src.repository.contacts import get_upcoming_birthdays
+from tests.conftest import TestingSessionLocal, engine
+
+owner = Principal(3, "birthdays@example.com", "birthdays", "avatar", True)
+
+BIRTHDAYS = {
+    "december": date(1980, 12, 31),
+    "new year": date(1991, 1, 1),
+    "january": date(1975, 1, 3),
+    "late january": date(1988, 1, 20),
+    "leap day": date(1992, 2, 29),
+    "march": date(1985, 3, 1),
+    "summer": date(1990, 7, 15),
+}
+
+
+def setup_module():
+    async def seed():
+        async with TestingSessionLocal() as session:
+            await session.execute(insert(User).values(id=owner.id, username=owner.username, email=owner.email,
+                                                      password="x", avatar=owner.avatar, verified=True))
+            await session.execute(insert(Contacts), [
+                {"full_name": name, "email": f"birthday{i}@example.com", "phone_number": f"8{i:09}",
+                 "birthday": birthday, "user_id": owner.id} for i, (name, birthday) in enumerate(BIRTHDAYS.items())
+            ])
+            await session.commit()
+
+    asyncio.run(seed())
+
+
+def upcoming(days: int, today: date) -> list[str]:
+    async def query():
+        async with TestingSessionLocal() as session:
+            return await get_upcoming_birthdays(days, 100, session, owner, today)
+
+    return [contact.full_name for contact in asyncio.run(query())]
+
+
+def test_window_within_the_year():
+    assert upcoming(10, date(2025, 7, 10)) == ["summer"]
+    assert upcoming(0, date(2025, 7, 15)) == ["summer"]
+    assert upcoming(1, date(2025, 2, 28)) == ["leap day", "march"]
+
+
+def test_window_wraps_into_next_year():
+    assert upcoming(5, date(2025, 12, 30)) == ["december", "new year", "january"]
+    assert upcoming(365, date(2025, 12, 30)) == ["december", "new year", "january", "late january", "leap day",
+                                                 "march", "summer"]
+
+
+def test_query_uses_month_day_index():
+    stmt = select(Contacts.id).where(Contacts.user_id == owner.id, month_day(Contacts.birthday).between(101, 110))
+    sql = stmt.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+
+    async def plan():
+        async with engine.connect() as conn:
+            return (await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+
+    assert any("ix_contacts_user_id_birthday_md" in row[-1] for row in asyncio.run(plan()))
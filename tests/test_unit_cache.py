@@ -0,0 +1,163 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.entity.principal import Principal
+from src.services.cache import LRUCache, UserCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_entry_expires_after_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("src.services.cache.time.monotonic", return_value=109.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("src.services.cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class TestPrincipal(unittest.TestCase):
+
+    def test_round_trip(self):
+        principal = Principal(1, "test@example.com", "test", "avatar", True)
+        self.assertEqual(Principal.loads(principal.dumps()), principal)
+
+    def test_foreign_payload_is_rejected(self):
+        self.assertIsNone(Principal.loads(b'[0,1,"test@example.com","test","avatar",true]'))
+        self.assertIsNone(Principal.loads(b"\x80\x04\x95"))
+        self.assertIsNone(Principal.loads(b"{}"))
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.redis = AsyncMock()
+        self.cache = UserCache(self.redis, ttl=300, local=LRUCache(maxsize=10, ttl=30))
+        self.principal = Principal(1, "test@example.com", "test", "avatar", True)
+
+    def assert_stored(self, principal):
+        key, data = self.redis.set.await_args.args
+        self.assertEqual(key, "test@example.com")
+        self.assertEqual(self.redis.set.await_args.kwargs, {"ex": 300})
+        stored, expires_at = self.cache._decode(data)
+        self.assertEqual(stored, principal)
+        self.assertAlmostEqual(expires_at, time.time() + 300, delta=5)
+
+    async def test_l2_hit_is_promoted_to_l1(self):
+        self.redis.get.return_value = self.cache._encode(self.principal)
+        self.assertEqual(await self.cache.get("test@example.com"), self.principal)
+        self.assertIs(await self.cache.get("test@example.com"), await self.cache.get("test@example.com"))
+        self.redis.get.assert_awaited_once_with("test@example.com")
+        stats = self.cache.stats()
+        self.assertEqual(stats["l1"]["hits"], 2)
+        self.assertEqual(stats["l1"]["misses"], 1)
+        self.assertEqual(stats["l2"]["hits"], 1)
+
+    async def test_miss_in_both_tiers(self):
+        self.redis.get.return_value = None
+        self.assertIsNone(await self.cache.get("test@example.com"))
+        self.assertEqual(self.cache.stats()["l2"]["misses"], 1)
+
+    async def test_entry_of_older_format_is_a_miss(self):
+        self.redis.get.return_value = self.principal.dumps()
+        self.assertIsNone(await self.cache.get("test@example.com"))
+
+    async def test_set_writes_both_tiers(self):
+        await self.cache.set("test@example.com", self.principal)
+        self.assert_stored(self.principal)
+        self.assertEqual(await self.cache.get("test@example.com"), self.principal)
+        self.redis.get.assert_not_awaited()
+
+    async def test_invalidate_drops_key_and_notifies_workers(self):
+        await self.cache.set("test@example.com", self.principal)
+        await self.cache.invalidate("test@example.com")
+        self.assertIsNone(self.cache.local.get("test@example.com"))
+        self.redis.delete.assert_awaited_once_with("test@example.com")
+        self.redis.publish.assert_awaited_once_with(self.cache.channel, f"{self.cache.node_id} test@example.com")
+
+    async def test_invalidate_writes_through_known_principal(self):
+        await self.cache.invalidate("test@example.com", self.principal)
+        self.redis.delete.assert_not_awaited()
+        self.assert_stored(self.principal)
+        self.assertEqual(self.cache.local.get("test@example.com"), self.principal)
+
+    def test_message_from_other_worker_drops_local_copy(self):
+        self.cache.local.set("test@example.com", self.principal)
+        self.cache.on_message(f"{self.cache.node_id} test@example.com".encode())
+        self.assertEqual(self.cache.local.get("test@example.com"), self.principal)
+        self.cache.on_message(b"other-worker test@example.com")
+        self.assertIsNone(self.cache.local.get("test@example.com"))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+    def slow_loader(self, result=None, error=None):
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            if error is not None:
+                raise error
+            return result
+
+        return load, calls
+
+    async def test_concurrent_misses_load_once(self):
+        self.redis.get.return_value = None
+        loader, calls = self.slow_loader(result=self.principal)
+        results = await asyncio.gather(*(self.cache.get_or_load("test@example.com", loader) for _ in range(20)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [self.principal] * 20)
+        self.assertEqual(self.cache.stats()["coalesced"], 19)
+        self.redis.set.assert_awaited_once()
+
+    async def test_failed_load_is_shared_and_not_cached(self):
+        self.redis.get.return_value = None
+        loader, calls = self.slow_loader(error=ConnectionError())
+        results = await asyncio.gather(*(self.cache.get_or_load("test@example.com", loader) for _ in range(3)),
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        self.assertEqual(len(calls), 1)
+        self.redis.set.assert_not_awaited()
+
+    async def test_cancelled_load_is_taken_over(self):
+        self.redis.get.return_value = None
+        loader, calls = self.slow_loader(result=self.principal)
+        leader = asyncio.create_task(self.cache.get_or_load("test@example.com", loader))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(self.cache.get_or_load("test@example.com", loader))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        self.assertEqual(await follower, self.principal)
+        self.assertEqual(len(calls), 2)
+
+    async def test_fresh_entry_is_served(self):
+        self.redis.get.return_value = self.cache._encode(self.principal)
+        loader = AsyncMock()
+        self.assertEqual(await self.cache.get_or_load("test@example.com", loader), self.principal)
+        loader.assert_not_awaited()
+
+    async def test_entry_close_to_expiry_is_refreshed_early(self):
+        self.cache._load_time = 0.5
+        self.redis.get.return_value = b"%.3f|" % (time.time() + 1) + self.principal.dumps()
+        loader = AsyncMock(return_value=self.principal)
+        with patch("src.services.cache.random.random", return_value=0.9):
+            self.assertEqual(await self.cache.get_or_load("test@example.com", loader), self.principal)
+        loader.assert_awaited_once()
+        self.assertEqual(self.cache.stats()["l2"]["early_refreshes"], 1)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from unittest.mock import AsyncMock
+
+from sqlalchemy import exc, text
+
+from src.database.db import DatabaseSessionManager
+from src.database.instrumentation import RequestQueries, current_queries
+from src.services.recent_writes import RecentWritesStore
+
+
+class TestDatabaseSessionManager(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.manager = DatabaseSessionManager(f"sqlite+aiosqlite:///{self.path}", pool_size=1, max_overflow=0,
+                                              pool_timeout=0.1, pool_pre_ping=True)
+
+    async def asyncTearDown(self) -> None:
+        await self.manager.close()
+        os.unlink(self.path)
+
+    async def test_pool_stats_track_checkouts_and_timeouts(self):
+        async with self.manager.session() as session:
+            await session.execute(text("SELECT 1"))
+            stats = self.manager.pool_stats()
+            self.assertEqual((stats["size"], stats["in_use"], stats["idle"]), (1, 1, 0))
+
+            with self.assertRaises(exc.TimeoutError):
+                async with self.manager.session() as starved:
+                    await starved.execute(text("SELECT 1"))
+
+        stats = self.manager.pool_stats()
+        self.assertEqual((stats["in_use"], stats["idle"], stats["overflow"]), (0, 1, 0))
+        self.assertEqual((stats["checkouts"], stats["timeouts"]), (2, 1))
+        self.assertGreaterEqual(stats["wait_max_ms"], 100)
+
+    async def test_close_disposes_the_engine(self):
+        async with self.manager.session() as session:
+            await session.execute(text("SELECT 1"))
+        engine = self.manager._engine
+        await self.manager.close()
+        self.assertEqual(engine.pool.checkedin(), 0)
+        with self.assertRaises(Exception):
+            async with self.manager.session():
+                pass
+
+
+class TestReadReplicas(unittest.IsolatedAsyncioTestCase):
+    """Separate SQLite files stand in for the primary and its replicas, each telling which one it is."""
+
+    async def asyncSetUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.urls = {}
+        for name in ("primary", "replica1", "replica2"):
+            self.urls[name] = f"sqlite+aiosqlite:///{self.dir.name}/{name}.db"
+            manager = DatabaseSessionManager(self.urls[name])
+            async with manager.session() as session:
+                await session.execute(text("CREATE TABLE node (name TEXT)"))
+                await session.execute(text("INSERT INTO node VALUES (:name)"), {"name": name})
+                await session.commit()
+            await manager.close()
+
+    async def asyncTearDown(self) -> None:
+        await self.manager.close()
+        self.dir.cleanup()
+
+    async def read(self, key: str | None = None) -> str:
+        async with self.manager.read_session(key) as session:
+            return (await session.execute(text("SELECT name FROM node"))).scalar_one()
+
+    async def test_reads_rotate_over_replicas(self):
+        self.manager = DatabaseSessionManager(self.urls["primary"],
+                                              replica_urls=[self.urls["replica1"], self.urls["replica2"]])
+        self.assertEqual([await self.read() for _ in range(4)], ["replica1", "replica2", "replica1", "replica2"])
+        async with self.manager.session() as session:
+            self.assertEqual((await session.execute(text("SELECT name FROM node"))).scalar_one(), "primary")
+        self.assertEqual(self.manager.replica_stats()["replica_reads"], 4)
+
+    async def test_unreachable_replica_is_skipped(self):
+        unreachable = f"sqlite+aiosqlite:///{self.dir.name}/missing/replica.db"
+        self.manager = DatabaseSessionManager(self.urls["primary"], replica_urls=[unreachable, self.urls["replica2"]],
+                                              replica_retry_after=60)
+        self.assertEqual([await self.read() for _ in range(3)], ["replica2", "replica2", "replica2"])
+        stats = self.manager.replica_stats()
+        self.assertEqual(stats["replica_failures"], 1)
+        self.assertEqual([replica["healthy"] for replica in stats["replicas"]], [False, True])
+
+    async def test_falls_back_to_primary_without_healthy_replica(self):
+        unreachable = f"sqlite+aiosqlite:///{self.dir.name}/missing/replica.db"
+        self.manager = DatabaseSessionManager(self.urls["primary"], replica_urls=[unreachable])
+        self.assertEqual(await self.read(), "primary")
+        self.assertEqual(await self.read(), "primary")
+        self.assertEqual(self.manager.replica_stats()["replica_failures"], 1)
+        self.assertEqual(self.manager.replica_stats()["primary_reads"], 2)
+        self.assertEqual(self.manager.pool_stats()["in_use"], 0)
+
+    async def test_unused_session_checks_out_nothing(self):
+        self.manager = DatabaseSessionManager(self.urls["primary"], replica_urls=[self.urls["replica1"]])
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+        try:
+            async with self.manager.read_session():
+                pass
+            async with self.manager.session():
+                pass
+            self.assertFalse(queries.checked_out)
+            await self.read()
+            self.assertTrue(queries.checked_out)
+        finally:
+            current_queries.reset(token)
+        self.assertEqual(self.manager.pool_stats()["checkouts"], 0)
+        self.assertEqual(self.manager.replica_stats()["replicas"][0]["checkouts"], 1)
+
+    async def test_reads_after_own_write_go_to_primary(self):
+        self.manager = DatabaseSessionManager(self.urls["primary"], replica_urls=[self.urls["replica1"]],
+                                              read_your_writes=60)
+        await self.manager.record_write("writer@example.com")
+        self.assertEqual(await self.read("writer@example.com"), "primary")
+        self.assertEqual(await self.read("reader@example.com"), "replica1")
+        self.assertEqual(await self.read(), "replica1")
+
+    async def test_recent_writes_are_looked_up_by_the_first_statement(self):
+        store = AsyncMock(RecentWritesStore)
+        store.is_recent.return_value = False
+        self.manager = DatabaseSessionManager(self.urls["primary"], replica_urls=[self.urls["replica1"]],
+                                              recent_writes=store)
+        async with self.manager.read_session("reader@example.com"):
+            pass
+        store.is_recent.assert_not_awaited()
+        self.assertEqual(await self.read("reader@example.com"), "replica1")
+        store.is_recent.assert_awaited_once_with("reader@example.com")
+
+    async def test_writes_are_not_recorded_without_replicas(self):
+        store = AsyncMock(RecentWritesStore)
+        self.manager = DatabaseSessionManager(self.urls["primary"], recent_writes=store)
+        await self.manager.record_write("writer@example.com")
+        store.mark.assert_not_awaited()
+
+    async def test_read_your_writes_window_expires(self):
+        self.manager = DatabaseSessionManager(self.urls["primary"], replica_urls=[self.urls["replica1"]],
+                                              read_your_writes=0.05)
+        await self.manager.record_write("writer@example.com")
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self.read("writer@example.com"), "replica1")
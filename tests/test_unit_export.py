@@ -0,0 +1,53 @@
+import asyncio
+import tracemalloc
+from datetime import date
+
+from sqlalchemy import insert
+
+from src.entity.models import Contacts, User
+from src.entity.principal import Principal
+from src.routes.contacts import export_chunks
+from tests.conftest import TestingSessionLocal
+
+CONTACTS = 20_000
+
+owner = Principal(2, "export@example.com", "export", "avatar", True)
+
+
+async def seed(start: int):
+    async with TestingSessionLocal() as session:
+        if not start:
+            await session.execute(insert(User).values(id=owner.id, username=owner.username, email=owner.email,
+                                                      password="x", avatar=owner.avatar, verified=True))
+        await session.execute(insert(Contacts), [
+            {"full_name": f"Export {i}", "email": f"export{i}@example.com", "phone_number": f"7{i:09}",
+             "birthday": date(1990, 1, 1 + i % 28), "user_id": owner.id} for i in range(start, start + CONTACTS)
+        ])
+        await session.commit()
+
+
+async def consume(format: str) -> tuple[int, int, int]:
+    lines = size = 0
+    tracemalloc.start()
+    try:
+        async for chunk in export_chunks(TestingSessionLocal, owner, format):
+            lines += chunk.count("\n")
+            size += len(chunk)
+        return lines, size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_memory_is_bounded():
+    asyncio.run(seed(0))
+    small = {format: asyncio.run(consume(format)) for format in ("ndjson", "csv")}
+    asyncio.run(seed(CONTACTS))
+    large = {format: asyncio.run(consume(format)) for format in ("ndjson", "csv")}
+    for format in ("ndjson", "csv"):
+        header = format == "csv"
+        assert small[format][0] == CONTACTS + header
+        assert large[format][0] == 2 * CONTACTS + header
+        # Twice the contacts, twice the output, but the peak stays where it was: no more than one
+        # batch of rows is held at a time
+        assert large[format][2] < small[format][2] * 1.25, (format, small[format], large[format])
+        assert large[format][2] < large[format][1] / 2, (format, large[format])
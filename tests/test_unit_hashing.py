@@ -0,0 +1,51 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from fastapi import HTTPException
+
+from src.services.hashing import PasswordHasher
+
+
+def slow_hash(password):
+    time.sleep(0.2)
+    return f"hashed-{password}"
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        context = MagicMock()
+        context.hash.side_effect = slow_hash
+        self.hasher = PasswordHasher(context, workers=1, max_queue=1)
+
+    def tearDown(self) -> None:
+        self.hasher.shutdown()
+
+    async def test_hash_does_not_block_event_loop(self):
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(heartbeat())
+        result = await self.hasher.hash("secret")
+        task.cancel()
+        self.assertEqual(result, "hashed-secret")
+        self.assertGreater(ticks, 5)
+        self.assertEqual(self.hasher.in_flight, 0)
+
+    async def test_rejects_when_queue_is_full(self):
+        running = asyncio.create_task(self.hasher.hash("first"))
+        queued = asyncio.create_task(self.hasher.hash("second"))
+        await asyncio.sleep(0)
+        self.assertEqual(self.hasher.stats()["queue_depth"], 1)
+        with self.assertRaises(HTTPException) as cm:
+            await self.hasher.hash("third")
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(self.hasher.rejected, 1)
+        self.assertEqual(await asyncio.gather(running, queued), ["hashed-first", "hashed-second"])
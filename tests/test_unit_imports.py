@@ -0,0 +1,40 @@
+import io
+import unittest
+
+from src.services.imports import ImportJob, read_vcard
+
+
+class TestReadVcard(unittest.TestCase):
+
+    def test_reads_cards_with_parameters_groups_and_folded_lines(self):
+        file = io.StringIO(
+            "BEGIN:VCARD\r\n"
+            "VERSION:4.0\r\n"
+            "FN:Wade Winston\r\n"
+            "  Wilson\r\n"
+            "item1.EMAIL;TYPE=home:wade@example.com\r\n"
+            "TEL;TYPE=cell:5550001111\r\n"
+            "TEL;TYPE=work:5550002222\r\n"
+            "BDAY:19731122\r\n"
+            "END:VCARD\r\n"
+            "BEGIN:VCARD\r\n"
+            "FN:Vanessa\r\n"
+            "END:VCARD\r\n"
+        )
+        cards = list(read_vcard(file))
+        self.assertEqual(cards, [
+            {"full_name": "Wade Winston Wilson", "email": "wade@example.com", "phone_number": "5550001111",
+             "birthday": "1973-11-22"},
+            {"full_name": "Vanessa"},
+        ])
+
+
+class TestImportJob(unittest.TestCase):
+
+    def test_round_trip_and_error_cap(self):
+        job = ImportJob(id="job", user_id=1)
+        for row in range(1000):
+            job.fail(row, "bad")
+        self.assertEqual(job.failed, 1000)
+        self.assertLess(len(job.errors), 1000)
+        self.assertEqual(ImportJob.loads(job.dumps()), job)
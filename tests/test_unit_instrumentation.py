@@ -0,0 +1,83 @@
+import logging
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.instrumentation import RequestQueries, current_queries, sql_instrumentation
+
+
+class TestSqlInstrumentation(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        self.instrumentation = sql_instrumentation
+        self.thresholds = patch.multiple(sql_instrumentation, slow_query=60, n_plus_one=3)
+        self.thresholds.start()
+        self.before = sql_instrumentation.stats()
+        self.queries = RequestQueries()
+        self.token = current_queries.set(self.queries)
+
+    async def asyncTearDown(self) -> None:
+        current_queries.reset(self.token)
+        self.thresholds.stop()
+        await self.engine.dispose()
+
+    def delta(self, name: str):
+        return self.instrumentation.stats()[name] - self.before[name]
+
+    async def test_records_request_statements(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(text("INSERT INTO item (name) VALUES (:name)"), [{"name": str(i)} for i in range(10)])
+            await conn.execute(text("SELECT * FROM item"))
+        self.assertEqual(self.queries.statements, 2)
+        self.assertGreater(self.queries.duration, 0)
+        self.assertIn(self.queries.slowest_statement, ["INSERT INTO item (name) VALUES (?)", "SELECT * FROM item"])
+        self.assertEqual(list(self.queries.shapes), ["SELECT * FROM item"])
+        self.assertEqual(self.delta("statements"), 2)
+
+        timing = self.instrumentation.finish(self.queries, "GET", "/items")
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="2 statements", db-slowest;dur=[\d.]+$')
+
+    async def test_statements_after_the_response_are_not_attributed(self):
+        self.instrumentation.finish(self.queries, "GET", "/items")
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SELECT * FROM item"))
+        self.assertEqual(self.queries.statements, 0)
+        self.assertEqual(self.delta("statements"), 1)
+
+    async def test_warns_about_repeated_statement(self):
+        async with self.engine.begin() as conn:
+            for i in range(4):
+                await conn.execute(text("SELECT * FROM item WHERE id = :id"), {"id": i})
+        with self.assertLogs("src.database.instrumentation", logging.WARNING) as logs:
+            self.instrumentation.finish(self.queries, "GET", "/items")
+        self.assertIn("ran the same statement 4 times", logs.output[0])
+        self.assertEqual(self.delta("repeated_statements"), 1)
+
+    async def test_executemany_is_not_a_repeat(self):
+        async with self.engine.begin() as conn:
+            for _ in range(4):
+                await conn.execute(text("INSERT INTO item (name) VALUES (:name)"), [{"name": "a"}, {"name": "b"}])
+        with self.assertNoLogs("src.database.instrumentation", logging.WARNING):
+            self.instrumentation.finish(self.queries, "POST", "/items")
+
+    async def test_counts_requests_without_checkout(self):
+        self.instrumentation.finish(RequestQueries(), "GET", "/items")
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        self.assertTrue(self.queries.checked_out)
+        self.instrumentation.finish(self.queries, "POST", "/items")
+        self.assertEqual(self.delta("requests"), 2)
+        self.assertEqual(self.delta("requests_without_checkout"), 1)
+
+    async def test_logs_slow_statement(self):
+        self.instrumentation.slow_query = 0
+        with self.assertLogs("src.database.instrumentation", logging.WARNING) as logs:
+            async with self.engine.begin() as conn:
+                await conn.execute(text("SELECT 1"))
+        self.assertIn("Slow statement", logs.output[0])
+        self.assertEqual(self.delta("slow_statements"), 1)
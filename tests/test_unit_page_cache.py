@@ -0,0 +1,30 @@
+import unittest
+
+from src.services.page_cache import ContactPageCache, InMemoryPageStore
+
+
+class TestContactPageCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.cache = ContactPageCache(InMemoryPageStore(), ttl=60)
+        self.key = ContactPageCache.key(10, 0, None, None, None, "owner")
+
+    async def test_round_trip(self):
+        version, cached = await self.cache.get(1, self.key)
+        self.assertIsNone(cached)
+        await self.cache.set(1, version, self.key, '"etag"', {"ETag": '"etag"'}, b'[{"id":1}]')
+        self.assertEqual(await self.cache.get(1, self.key), (version, ('"etag"', {"ETag": '"etag"'}, b'[{"id":1}]')))
+
+    async def test_bump_invalidates_only_that_user(self):
+        for user_id in (1, 2):
+            version, _ = await self.cache.get(user_id, self.key)
+            await self.cache.set(user_id, version, self.key, '"etag"', {}, b"[]")
+        await self.cache.bump(1)
+        self.assertIsNone((await self.cache.get(1, self.key))[1])
+        self.assertIsNotNone((await self.cache.get(2, self.key))[1])
+
+    async def test_page_read_before_a_write_is_not_served_after_it(self):
+        version, _ = await self.cache.get(1, self.key)
+        await self.cache.bump(1)
+        await self.cache.set(1, version, self.key, '"stale"', {}, b"[]")
+        self.assertIsNone((await self.cache.get(1, self.key))[1])
@@ -1,5 +1,7 @@
 import unittest
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from redis.exceptions import ConnectionError
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.entity.models import Contacts, User
@@ -44,6 +46,15 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
         result = await get_contact(contact_id, self.session, self.user)
         self.assertEqual(result, contacts)
 
+    async def test_get_contact_reuses_statement(self):
+        self.session.execute.return_value = MagicMock()
+        await get_contact(1, self.session, self.user, ["id", "email"])
+        await get_contact(2, self.session, self.user, ("id", "email"))
+        (first, first_params), (second, second_params) = (call.args for call in self.session.execute.await_args_list)
+        self.assertIs(first, second)
+        self.assertEqual((first_params, second_params),
+                         ({"contact_id": 1, "user_id": 1}, {"contact_id": 2, "user_id": 1}))
+
     async def test_create_contact(self):
         body = ContactSchema(full_name="test_name", email="test_email@example.com",
                              phone_number="1234567890", birthday="2024-01-01")
@@ -56,10 +67,32 @@ class TestAsyncContacts(unittest.IsolatedAsyncioTestCase):
         contact_id = 1
         body = ContactUpdateSchema(full_name="test_name", email="test_email@example.com",
                                    phone_number="9876543210", birthday="2024-01-01")
-        contacts = Contacts(id=1, full_name="test_name1", email="test_email@example.com",
-                            phone_number="1236547891", birthday="2024-01-01", user=self.user)
-        mocked_contacts = MagicMock()
-        mocked_contacts.scalar_one_or_none.return_value = contacts
-        self.session.execute.return_value = mocked_contacts
+        contact = {"id": 1, "full_name": "test_name1", "email": "test_email@example.com",
+                   "phone_number": body.phone_number, "birthday": body.birthday}
+        mocked_contact = MagicMock()
+        mocked_contact.mappings.return_value.one_or_none.return_value = contact
+        self.session.execute.return_value = mocked_contact
         result = await update_contact(contact_id, body, self.session, self.user)
-        self.assertEqual(result.phone_number, body.phone_number)
+        self.assertEqual(result["phone_number"], body.phone_number)
+        self.session.execute.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
+
+    async def test_delete_contact(self):
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = 1
+        self.session.execute.return_value = mocked_contact
+        result = await delete_contact(1, self.session, self.user)
+        self.assertEqual(result, 1)
+        # The DELETE ... RETURNING and the tombstone insert, committed together
+        self.assertEqual(self.session.execute.await_count, 2)
+        self.session.commit.assert_awaited_once()
+
+    async def test_page_cache_outage_does_not_fail_committed_write(self):
+        body = ContactSchema(full_name="test_name", email="test_email@example.com",
+                             phone_number="1234567890", birthday="2024-01-01")
+        with patch("src.repository.contacts.contacts_page_cache.bump", new_callable=AsyncMock) as bump:
+            bump.side_effect = ConnectionError("Redis is down")
+            with self.assertLogs("src.repository.contacts", "WARNING"):
+                result = await create_contact(body, self.session, self.user)
+        self.assertEqual(result.email, body.email)
+        self.session.commit.assert_awaited_once()
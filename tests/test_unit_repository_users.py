@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from redis.exceptions import ConnectionError
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.entity.models import User
+from src.entity.principal import Principal
+from src.repository.users import confirmed_email, update_avatar_url
+
+
+class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.session = AsyncMock(spec=AsyncSession)
+        self.user = User(id=1, username="test", email="test@example.com", avatar="avatar", verified=False)
+        mocked_user = MagicMock()
+        mocked_user.scalar_one_or_none.return_value = self.user
+        self.session.execute.return_value = mocked_user
+
+    async def test_confirmed_email_updates_user_cache(self):
+        self.user.verified = True  # the row as returned by UPDATE ... RETURNING
+        with patch("src.repository.users.user_cache", new_callable=AsyncMock) as cache_mock:
+            await confirmed_email(self.user.email, self.session)
+        self.session.execute.assert_awaited_once()
+        cache_mock.invalidate.assert_awaited_once_with(
+            self.user.email, Principal(1, "test@example.com", "test", "avatar", True))
+
+    async def test_update_avatar_url_updates_user_cache(self):
+        self.user.avatar = "new_avatar"
+        with patch("src.repository.users.user_cache", new_callable=AsyncMock) as cache_mock:
+            result = await update_avatar_url(self.user.email, "new_avatar", self.session)
+        self.assertEqual(result.avatar, "new_avatar")
+        self.session.execute.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
+        cache_mock.invalidate.assert_awaited_once_with(
+            self.user.email, Principal(1, "test@example.com", "test", "new_avatar", False))
+
+    async def test_cache_outage_does_not_fail_committed_write(self):
+        self.user.avatar = "new_avatar"
+        with patch("src.repository.users.user_cache", new_callable=AsyncMock) as cache_mock:
+            cache_mock.invalidate.side_effect = ConnectionError("Redis is down")
+            with self.assertLogs("src.repository.users", "WARNING"):
+                result = await update_avatar_url(self.user.email, "new_avatar", self.session)
+            with self.assertLogs("src.repository.users", "WARNING"):
+                await confirmed_email(self.user.email, self.session)
+        self.assertEqual(result.avatar, "new_avatar")
+        self.session.commit.assert_awaited()
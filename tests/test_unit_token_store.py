@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import patch
+
+from src.services.token_store import InMemoryRefreshTokenStore
+
+
+class TestInMemoryRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.store = InMemoryRefreshTokenStore()
+
+    async def test_rotation(self):
+        await self.store.issue("test@example.com", "family", "jti-1", ttl=60)
+        self.assertTrue(await self.store.rotate("test@example.com", "family", "jti-1", "jti-2", ttl=60))
+        self.assertTrue(await self.store.rotate("test@example.com", "family", "jti-2", "jti-3", ttl=60))
+
+    async def test_reuse_revokes_family(self):
+        await self.store.issue("test@example.com", "family", "jti-1", ttl=60)
+        await self.store.rotate("test@example.com", "family", "jti-1", "jti-2", ttl=60)
+        self.assertFalse(await self.store.rotate("test@example.com", "family", "jti-1", "jti-3", ttl=60))
+        self.assertFalse(await self.store.rotate("test@example.com", "family", "jti-2", "jti-3", ttl=60))
+
+    async def test_families_are_independent(self):
+        await self.store.issue("test@example.com", "laptop", "jti-1", ttl=60)
+        await self.store.issue("test@example.com", "phone", "jti-2", ttl=60)
+        await self.store.revoke("test@example.com", "laptop")
+        self.assertFalse(await self.store.rotate("test@example.com", "laptop", "jti-1", "jti-3", ttl=60))
+        self.assertTrue(await self.store.rotate("test@example.com", "phone", "jti-2", "jti-4", ttl=60))
+
+    async def test_expired_token_is_rejected(self):
+        with patch("src.services.token_store.time.monotonic", return_value=100.0):
+            await self.store.issue("test@example.com", "family", "jti-1", ttl=60)
+        with patch("src.services.token_store.time.monotonic", return_value=160.0):
+            self.assertFalse(await self.store.rotate("test@example.com", "family", "jti-1", "jti-2", ttl=60))
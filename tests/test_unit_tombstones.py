@@ -0,0 +1,46 @@
+import unittest
+from datetime import timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.entity.models import Base, ContactTombstone
+from src.entity.principal import Principal
+from src.repository.contacts import get_changes, purge_tombstones
+
+
+class TestTombstones(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        self.session_maker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.user = Principal(1, "test@example.com", "test", "avatar", True)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.dispose()
+
+    async def add(self, *ages: timedelta):
+        # Stamped by the database clock, like the default CURRENT_TIMESTAMP
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(ContactTombstone).values([
+                {"contact_id": 100 + i, "user_id": self.user.id,
+                 "deleted_at": func.datetime("now", f"-{age.total_seconds()} seconds")} for i, age in enumerate(ages)
+            ]))
+
+    async def test_purges_only_expired_tombstones(self):
+        await self.add(timedelta(days=31), timedelta(days=29), timedelta(0))
+        async with self.session_maker() as db:
+            self.assertEqual(await purge_tombstones(timedelta(days=30).total_seconds(), db), 1)
+            left = await db.execute(select(ContactTombstone.contact_id).order_by(ContactTombstone.id))
+        self.assertEqual(left.scalars().all(), [101, 102])
+
+    async def test_stops_at_first_unsettled_tombstone(self):
+        # An older id stamped later: its transaction started after the next one's
+        await self.add(timedelta(minutes=5), timedelta(0), timedelta(minutes=4))
+        async with self.session_maker() as db:
+            _, deleted, position = await get_changes(None, 0, 10, db, self.user, margin=60)
+            self.assertEqual((deleted, position), ([(1, 100)], 1))
+            _, deleted, position = await get_changes(None, None, 10, db, self.user, margin=60)
+            self.assertEqual(position, 1)